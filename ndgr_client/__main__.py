@@ -23,18 +23,19 @@ async def stream(
     print(Rule(characters='-', style=Style(color='#E33157')))
 
     # NDGRClient を初期化
-    ndgr_client = NDGRClient(nicolive_program_id, verbose=verbose, console_output=True)
+    ## 終了時には HTTP クライアントとログファイルを閉じる
+    async with NDGRClient(nicolive_program_id, verbose=verbose, console_output=True) as ndgr_client:
 
-    # メールアドレスとパスワードが指定されている場合はログイン
-    if mail is not None and password is not None:
-        await ndgr_client.login(mail, password)
+        # メールアドレスとパスワードが指定されている場合はログイン
+        if mail is not None and password is not None:
+            await ndgr_client.login(mail, password)
 
-    # コメントをエンドレスでストリーミング開始
-    async for comment in ndgr_client.streamComments():
-        if verbose is True:
-            print(f'[{datetime.now().strftime("%Y/%m/%d %H:%M:%S.%f")}] Comment Received. [grey70](ID: {comment.id})[/grey70]')
-        print(str(comment))
-        print(Rule(characters='-', style=Style(color='#E33157')))
+        # コメントをエンドレスでストリーミング開始
+        async for comment in ndgr_client.streamComments():
+            if verbose is True:
+                print(f'[{datetime.now().strftime("%Y/%m/%d %H:%M:%S.%f")}] Comment Received. [grey70](ID: {comment.id})[/grey70]')
+            print(str(comment))
+            print(Rule(characters='-', style=Style(color='#E33157')))
 
 
 @app.command(help='Download backward comments (kakolog) from NDGR server.')
@@ -55,21 +56,21 @@ async def download(
 
     comment_counts: dict[str, int] = {}
     for jid in jikkyo_ids:
-        # NDGRClient を初期化
-        ndgr_client = NDGRClient(jid, verbose=verbose, console_output=True)
+        # NDGRClient を初期化し、コメントのダウンロードが終わったら HTTP クライアントとログファイルを閉じる
+        async with NDGRClient(jid, verbose=verbose, console_output=True) as ndgr_client:
 
-        # メールアドレスとパスワードが指定されている場合はログイン
-        if mail is not None and password is not None:
-            await ndgr_client.login(mail, password)
+            # メールアドレスとパスワードが指定されている場合はログイン
+            if mail is not None and password is not None:
+                await ndgr_client.login(mail, password)
 
-        # コメントをダウンロード
-        comments = await ndgr_client.downloadBackwardComments()
+            # コメントをダウンロード
+            comments = await ndgr_client.downloadBackwardComments()
         comment_counts[jid] = len(comments)
 
         # output_dir に {jid}.nicojk として保存
         output_dir.mkdir(parents=True, exist_ok=True)
         with open(output_dir / f'{jid}.nicojk', mode='w', encoding='utf-8') as f:
-            f.write(NDGRClient.convertToXMLString(comments))
+            NDGRClient.writeXML(comments, f)
         print(f'Total comments for {jid}: {comment_counts[jid]}')
         print(f'Saved to {output_dir / f"{jid}.nicojk"}.')
         print(Rule(characters='=', style=Style(color='#E33157')))
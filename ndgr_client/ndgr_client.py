@@ -2,20 +2,31 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import atexit
+import contextlib
+import functools
+import html
+import io
+import math
+import operator
+import orjson
 import httpx
 import lxml.etree as ET
+import random
 import re
+import time
 import traceback
 import websockets
-from bs4 import BeautifulSoup, Tag
-from collections.abc import Sequence
+from google.protobuf.internal import api_implementation
+from collections import deque, OrderedDict
+from collections.abc import Coroutine, Iterable, Mapping, Sequence
 from datetime import date, datetime
 from pathlib import Path
+from types import MappingProxyType
 from rich import print
 from rich.rule import Rule
 from rich.style import Style
-from typing import Any, AsyncGenerator, cast, Literal, Type, TypedDict, TypeVar
+from typing import Any, AsyncGenerator, Literal, TextIO, Type, TypedDict, TypeVar
 
 from ndgr_client import __version__
 from ndgr_client.protobuf_stream_reader import ProtobufStreamReader
@@ -29,6 +40,165 @@ from ndgr_client.constants import (
 )
 
 
+# 秒単位の UNIX タイムスタンプから datetime を生成する処理のキャッシュ
+## 同じ秒に投稿されたコメントは多いため、秒単位の datetime を使い回し、秒未満はマイクロ秒単位の整数で置き換える
+_datetime_from_seconds = functools.lru_cache(maxsize=1024)(datetime.fromtimestamp)
+
+
+@functools.lru_cache(maxsize=1024)
+def _timestamp_from_datetime(dt: datetime, fold: int) -> float:
+    """
+    秒単位に丸めた datetime から UNIX タイムスタンプを求める処理 (naive な datetime ではローカルタイムゾーンの解決を伴い重い) のキャッシュ
+    naive な datetime は fold (夏時間終了時に 2 回現れる時刻のどちらか) が異なっても等しいとみなされるため、fold をキーに含めて区別する
+
+    Args:
+        dt (datetime): 秒単位に丸めた datetime
+        fold (int): dt.fold の値
+
+    Returns:
+        float: UNIX タイムスタンプ
+    """
+
+    return dt.timestamp()
+
+
+# Protobuf の各列挙型の値から、NDGRComment に格納する文字列への変換テーブル
+## コメントごとに EnumDescriptor から名前を引いて小文字化し直さずに済むよう、モジュールの読み込み時に一度だけ作成する
+_ACCOUNT_STATUS_NAMES: dict[int, str] = {value.number: value.name for value in atoms.Chat.AccountStatus.DESCRIPTOR.values}
+_POSITION_NAMES: dict[int, str] = {value.number: value.name.lower() for value in atoms.Chat.Modifier.Pos.DESCRIPTOR.values}
+_SIZE_NAMES: dict[int, str] = {value.number: value.name.lower() for value in atoms.Chat.Modifier.Size.DESCRIPTOR.values}
+_COLOR_NAMES: dict[int, str] = {value.number: value.name.lower() for value in atoms.Chat.Modifier.ColorName.DESCRIPTOR.values}
+_FONT_NAMES: dict[int, str] = {value.number: value.name.lower() for value in atoms.Chat.Modifier.Font.DESCRIPTOR.values}
+_OPACITY_NAMES: dict[int, str] = {value.number: value.name for value in atoms.Chat.Modifier.Opacity.DESCRIPTOR.values}
+
+# ニコニコチャンネルのページから番組の視聴ページへのリンクを抽出する XPath
+## 放送中番組は div#live_now 内の最初のリンク、過去番組は過去番組一覧内のすべてのリンクを対象とする
+## href の値は文字列としてしか使わないため、smart_strings=False で親要素への参照を持たない素の str を返させている
+_LIVE_NOW_PROGRAM_HREF_XPATH = ET.XPath('(//div[@id="live_now"]//a[starts-with(@href, "https://live.nicovideo.jp/watch/lv")])[1]/@href', smart_strings=False)
+_PAST_LIVES_PROGRAM_HREF_XPATH = ET.XPath('//a[contains(@href, "https://live.nicovideo.jp/watch/")]/@href', smart_strings=False)
+
+# ニコニコ生放送の視聴ページから embedded-data の data-props 属性の値を抜き出す正規表現
+## 視聴ページから必要なのはこの属性値だけなので、通常は HTML 全体をパースせずにこの正規表現で直接取り出す
+_EMBEDDED_DATA_PROPS_PATTERN = re.compile(rb'id="embedded-data"[^>]*data-props="([^"]*)"')
+## 正規表現にマッチしなかった場合のフォールバックとして、視聴ページ全体をパースする際に使う lxml の HTML パーサーと XPath
+_WATCH_PAGE_HTML_PARSER = ET.HTMLParser(encoding='utf-8')
+_EMBEDDED_DATA_PROPS_XPATH = ET.XPath('//*[@id="embedded-data"]/@data-props', smart_strings=False)
+
+# XML と互換性のない制御文字を除去するための str.translate() 用の変換テーブル
+## 有効な XML 制御文字 (タブ、改行、復帰) は保持する
+## 正規表現で置換するよりも、文字単位で削除する str.translate() の方が高速
+_XML_INCOMPATIBLE_CHARS_TABLE = dict.fromkeys([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F])
+## 上記の制御文字の除去に加え、XML の属性値・テキストとして書き出す際に必要なエスケープも同時に行う変換テーブル
+## エスケープする文字は lxml.etree でシリアライズした場合と同一にしている
+_XML_ATTRIBUTE_ESCAPE_TABLE: dict[int, str | None] = {
+    **_XML_INCOMPATIBLE_CHARS_TABLE,
+    ord('&'): '&amp;', ord('<'): '&lt;', ord('>'): '&gt;', ord('"'): '&quot;',
+    ord('\t'): '&#9;', ord('\n'): '&#10;', ord('\r'): '&#13;',
+}
+_XML_TEXT_ESCAPE_TABLE: dict[int, str | None] = {
+    **_XML_INCOMPATIBLE_CHARS_TABLE,
+    ord('&'): '&amp;', ord('<'): '&lt;', ord('>'): '&gt;',
+    ord('\r'): '&#13;',
+}
+
+# getProgramIDsOnDate() で取得した放送終了済みの番組の放送期間のキャッシュ
+## キーはニコニコ生放送番組 ID で、値は (放送開始日時, 放送終了日時) のタプル (タイムシフト非公開の番組は None)
+## 日付を変えながら getProgramIDsOnDate() を繰り返し呼び出すと、同じ過去番組の情報を何度も取得することになるため、プロセス内でキャッシュしている
+## プロセスが長時間動き続けてもメモリを使い続けないよう、NDGRClient.ENDED_PROGRAM_BROADCAST_PERIOD_CACHE_MAX_SIZE 件を超えたら最も古く参照された番組から破棄する
+_ENDED_PROGRAM_BROADCAST_PERIOD_CACHE: OrderedDict[str, tuple[datetime, datetime] | None] = OrderedDict()
+
+_T = TypeVar('_T')
+
+async def _run_concurrently(coroutines: Iterable[Coroutine[Any, Any, _T]]) -> list[_T]:
+    """
+    複数のコルーチンを並行して実行し、渡した順に結果を返す
+    asyncio.gather() と異なり、いずれかが例外を送出した時点で残りのタスクをキャンセルし、すべてのタスクの終了を待ってから戻る
+    (呼び出し元で使っている httpx.AsyncClient などが、実行中のタスクを残したまま閉じられることがないようにするため)
+    呼び出し元で例外の種類ごとに処理できるよう、送出する例外は ExceptionGroup ではなく最初に発生した例外そのものとする
+
+    Args:
+        coroutines (Iterable[Coroutine[Any, Any, _T]]): 実行するコルーチン
+
+    Returns:
+        list[_T]: 各コルーチンの戻り値
+    """
+
+    try:
+        async with asyncio.TaskGroup() as task_group:
+            tasks = [task_group.create_task(coroutine) for coroutine in coroutines]
+    except ExceptionGroup as ex:
+        raise ex.exceptions[0] from None
+    return [task.result() for task in tasks]
+
+@functools.lru_cache(maxsize=4096)
+def _build_mail_command(is_anonymous: bool, position: str, size: str, color: str | tuple[int, int, int], font: str, opacity: str) -> str:
+    """
+    コメントの装飾情報から、XML 互換コメントの "mail" フィールドに入るコメントコマンド (ex: 184 shita big #ff0000) を生成する
+    装飾情報の組み合わせは限られており、同じ組み合わせのコメントが大量に投稿されるため、結果をキャッシュして使い回す
+    フルカラー指定のコメントが多いと組み合わせが際限なく増えうるため、キャッシュの件数には上限を設けている
+
+    Args:
+        is_anonymous (bool): ユーザー ID が匿名化されているか
+        position (str): コメントの位置
+        size (str): コメントのサイズ
+        color (str | tuple[int, int, int]): コメントの色 (フルカラー指定の場合は (r, g, b) のタプル)
+        font (str): コメントのフォント
+        opacity (str): コメントの不透明度
+
+    Returns:
+        str: コメントコマンド
+    """
+
+    command: list[str] = []
+    # raw_user_id が 0 の場合はユーザー ID が匿名化されているため、"184" コマンドを付与する
+    if is_anonymous:
+        command.append('184')
+    if position != 'naka':
+        command.append(position)
+    if size != 'medium':
+        command.append(size)
+    if isinstance(color, str):
+        if color != 'white':
+            command.append(color)
+    else:
+        # フルカラー指定の場合はカラーコードに変換する
+        command.append('#{:02x}{:02x}{:02x}'.format(*color))
+    if font != 'defont':
+        command.append(font)
+    # コメントの不透明度を表すコメントコマンドは従来存在しないが、
+    ## コメントの装飾情報は原則保存しておきたいので、特別に opacity が "Translucent" の場合のみ "translucent" コマンドを付与する
+    if opacity == 'Translucent':
+        command.append('translucent')
+    return ' '.join(command)
+
+
+# 動作ログの区切り線
+## ログを出力するたびに Rule と Style を生成し直さずに済むよう、1 つのインスタンスを使い回す
+_SECTION_RULE = Rule(characters='-', style=Style(color='#E33157'))
+
+# ログファイルのパスごとの (ファイルオブジェクト, そのファイルオブジェクトを使っている NDGRClient インスタンスの数)
+## 同じパスに書き込むインスタンスごとに別々にバッファリングすると、フラッシュのタイミング次第でログの行の順序が入れ替わるため、
+## 同じパスのログファイルは 1 つのファイルオブジェクトを全インスタンスで共有し、最後のインスタンスが aclose() した時点で閉じる
+_SHARED_LOG_FILES: dict[Path, tuple[TextIO, int]] = {}
+
+
+class _LogFileWriter:
+    """
+    rich の print() は出力のたびに出力先の flush() を呼ぶため、そのままログファイルを渡すとバッファリングが効かない
+    rich からの flush() を無視し、ログファイルへのフラッシュを NDGRClient.print() 側で制御するためのラッパー
+    """
+
+    def __init__(self, file: TextIO) -> None:
+        self.file = file
+        self.encoding = file.encoding
+
+    def write(self, text: str) -> int:
+        return self.file.write(text)
+
+    def flush(self) -> None:
+        pass
+
+
 class NDGRClient:
     """
     NDGR メッセージサーバーのクライアント実装
@@ -42,7 +212,8 @@ class NDGRClient:
     """
 
     # HTTP ヘッダー を Chrome 126 に偽装
-    HTTP_HEADERS = {
+    ## 全インスタンスで共有するため、誤って書き換えられないよう読み取り専用にしている
+    HTTP_HEADERS: Mapping[str, str] = MappingProxyType({
         'accept': '*/*',
         'accept-encoding': 'gzip, deflate, br',
         'accept-language': 'ja',
@@ -55,10 +226,37 @@ class NDGRClient:
         'sec-fetch-mode': 'cors',
         'sec-fetch-site': 'same-site',
         'user-agent': f'Mozilla/5.0 (Windows NT 15.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36 NDGRClient/{__version__}',
-    }
+    })
+
+    # HTTP クライアントのコネクションプールの設定
+    ## NDGR View API / NDGR Segment API へのポーリングで毎回 TCP / TLS ハンドシェイクが走らないよう、接続を長めに維持する
+    HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+
+    # HTTP クライアントのデフォルトのタイムアウト (秒)
+    ## Protobuf ストリームの受信時のみ、別途 read タイムアウトを長めに設定している
+    HTTP_TIMEOUT = httpx.Timeout(15.0)
+
+    # streamComments() で受信したコメントを溜めておくキューの最大サイズと、詳細な動作ログで警告を出すサイズ
+    COMMENT_QUEUE_MAX_SIZE = 4096
+    COMMENT_QUEUE_WARNING_SIZE = 3000
+
+    # 暫定版ニコニコ実況が運用されていた期間 (余裕を持たせている)
+    PROVISIONAL_JIKKYO_PERIOD: tuple[date, date] = (date(2024, 6, 1), date(2024, 8, 31))
+
+    # getProgramIDsOnDate() で使う各 URL のテンプレート
+    CHANNEL_LIVE_URL = 'https://ch.nicovideo.jp/{}/live'
+    CHANNEL_PAST_LIVES_URL = 'https://sp.ch.nicovideo.jp/api/past_lives/?page={}&channel_id={}'
+    PROGRAM_INFO_API_URL = 'https://api.cas.nicovideo.jp/v1/services/live/programs/{}'
+
+    # getProgramIDsOnDate() で取得した放送終了済みの番組の放送期間をキャッシュする最大件数
+    ENDED_PROGRAM_BROADCAST_PERIOD_CACHE_MAX_SIZE = 2048
+
+    # getProgramIDsOnDate() で番組情報を並行して取得する際の最大同時リクエスト数
+    PROGRAM_INFO_FETCH_CONCURRENCY = 16
 
     # 旧来の実況チャンネル ID とニコニコチャンネル ID のマッピング
-    JIKKYO_CHANNEL_ID_MAP: dict[str, str] = {
+    ## 全インスタンスで共有するため、誤って書き換えられないよう読み取り専用にしている
+    JIKKYO_CHANNEL_ID_MAP: Mapping[str, str] = MappingProxyType({
         'jk1': 'ch2646436',
         'jk2': 'ch2646437',
         'jk4': 'ch2646438',
@@ -69,7 +267,37 @@ class NDGRClient:
         'jk9': 'ch2646485',
         'jk101': 'ch2647992',
         'jk211': 'ch2646846',
-    }
+    })
+
+    # NDGR Backward API からアクセス制限 (403 / 429) を受けた際の待機時間の最小値・最大値 (秒) と最大リトライ回数
+    BACKWARD_API_MIN_BACKOFF = 0.5
+    BACKWARD_API_MAX_BACKOFF = 30.0
+    BACKWARD_API_MAX_RETRIES = 5
+    # アクセス制限を受けた際の待機時間に加える揺らぎの最大割合
+    BACKWARD_API_BACKOFF_JITTER = 0.2
+
+    # NDGR View API / NDGR Segment API の Protobuf ストリームの取得に失敗した際の最大試行回数と、リトライまでの待機時間の最小値・最大値 (秒)
+    ## 待機時間は最小値から倍々に伸ばし (0.25 → 0.5 → 1 → 2 → 4 → 8 秒)、合計で 15 秒程度は復旧を待つ
+    PROTOBUF_STREAM_MAX_RETRIES = 7
+    PROTOBUF_STREAM_MIN_RETRY_DELAY = 0.25
+    PROTOBUF_STREAM_MAX_RETRY_DELAY = 8.0
+    # Protobuf ストリームの取得に失敗した際の待機時間に加える揺らぎの最大割合
+    PROTOBUF_STREAM_RETRY_JITTER = 0.2
+
+    # streamComments() で NDGR View API からの ChunkedEntry の受信に失敗した際の最大試行回数と、リトライまでの待機時間の最小値・最大値 (秒)
+    ## 一時的な瞬断からはすぐに復帰できるよう最小値から倍々に伸ばし (0.1 → 0.2 → 0.4 → 0.8 秒)、最大値で頭打ちにする
+    VIEW_API_MAX_RETRIES = 5
+    VIEW_API_MIN_RETRY_DELAY = 0.05
+    VIEW_API_MAX_RETRY_DELAY = 4.0
+    # NDGR View API からの受信に失敗した際の待機時間に加える揺らぎの最大値 (秒)
+    VIEW_API_RETRY_JITTER = 0.1
+    # NDGR Backward API の次のページを先読みしている間、コメントの変換処理を何件ごとに中断してイベントループに制御を返すか
+    BACKWARD_API_PREFETCH_YIELD_INTERVAL = 64
+
+    # 詳細な動作ログをログファイルへ書き込む際に、フラッシュする間隔 (行数) とバッファサイズ (バイト)
+    ## コメント 1 件分の詳細な動作ログは数百バイトあるため、既定の 8KB のバッファだと LOG_FILE_FLUSH_INTERVAL 行に達する前に書き出されてしまう
+    LOG_FILE_FLUSH_INTERVAL = 100
+    LOG_FILE_BUFFER_SIZE = 64 * 1024
 
 
     def __init__(self, nicolive_id: str, verbose: bool = False, console_output: bool = False, log_path: Path | None = None) -> None:
@@ -109,8 +337,48 @@ class NDGRClient:
         self.show_log = console_output
         self.log_path = log_path
 
+        # ログファイルのファイルオブジェクトと、_SHARED_LOG_FILES でのキー (初回のログ出力時に開き、以降は aclose() するまで使い回す)
+        self._log_file: TextIO | None = None
+        self._log_file_key: Path | None = None
+        # rich から書き込む際に使う、flush() を無視するログファイルのラッパー
+        self._log_file_writer: TextIO | None = None
+        # 前回フラッシュしてからログファイルに書き込んだ行数
+        self._log_file_unflushed_lines: int = 0
+
+        # NDGR Backward API へのアクセス時の現在の待機時間 (秒)
+        ## アクセス制限を受けたときだけ伸ばし、取得に成功するごとに縮める
+        self._backward_backoff: float = 0.0
+
+        # fetchNicoLiveProgramInfo() で最後に取得した番組情報と、その取得キー ((ニコニコ生放送番組 ID, 取得時の UNIX 時刻 // 60))
+        ## 同じ分の間に番組情報が何度も要求された場合は、視聴ページを再取得せずにこの番組情報を返す
+        self._program_info_cache: tuple[tuple[str, int], NicoLiveProgramInfo] | None = None
+
+        # 前回取得した視聴ページの (URL, ETag, Last-Modified, embedded-data)
+        ## 視聴ページに ETag / Last-Modified ヘッダーが付いている場合のみ保持し、次回の取得時に条件付きリクエストを送るために使う
+        self._watch_page_cache: tuple[str, str | None, str | None, dict[str, Any]] | None = None
+
         # httpx の非同期 HTTP クライアントのインスタンスを作成
-        self.httpx_client = httpx.AsyncClient(headers=self.HTTP_HEADERS, follow_redirects=True)
+        ## HTTP/2 を有効にし、同一ホストへの複数のリクエストを 1 本の TLS セッション上で多重化する
+        self.httpx_client = httpx.AsyncClient(
+            headers = self.HTTP_HEADERS,
+            follow_redirects = True,
+            http2 = True,
+            limits = self.HTTP_LIMITS,
+            timeout = self.HTTP_TIMEOUT,
+        )
+
+        # protobuf が pure-Python 実装で動作している場合は、Protobuf メッセージのパースが大幅に遅くなるため警告する
+        ## 通常は upb (C 拡張) 実装が使われるが、対応する wheel がない環境や環境変数での指定により pure-Python 実装になることがある
+        if api_implementation.Type() == 'python':
+            self.print('Warning: protobuf is running on the pure-Python implementation. Parsing comments will be significantly slower.')
+
+
+    async def __aenter__(self) -> NDGRClient:
+        return self
+
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
 
 
     @property
@@ -149,7 +417,7 @@ class NDGRClient:
                 self.httpx_client.cookies.set(key, value, domain='.nicovideo.jp', path='/')
 
             # https://account.nicovideo.jp/login にアクセスして x-niconico-id ヘッダーがセットされているか確認
-            response = await self.httpx_client.get('https://account.nicovideo.jp/login', timeout=15.0)
+            response = await self.httpx_client.get('https://account.nicovideo.jp/login')
             response.raise_for_status()
             if 'x-niconico-id' not in response.headers:
                 return None
@@ -163,19 +431,24 @@ class NDGRClient:
                 response = await self.httpx_client.post('https://account.nicovideo.jp/api/v1/login', data={
                     'mail': mail,
                     'password': password,
-                }, timeout=15.0)
+                })
                 response.raise_for_status()
                 # x-niconico-id ヘッダーがセットされていない場合はログインに失敗している
                 if 'x-niconico-id' not in response.headers:
                     return None
-                self.print(f'Login successful. Niconico User ID: {response.headers["x-niconico-id"]}', verbose_log=True)
-                self.print(Rule(characters='-', style=Style(color='#E33157')), verbose_log=True)
+                if self.verbose is True:
+                    self.print(f'Login successful. Niconico User ID: {response.headers["x-niconico-id"]}', verbose_log=True)
+                    self.print(_SECTION_RULE, verbose_log=True)
             except httpx.HTTPStatusError:
                 self.print('Error during login:')
                 self.print(traceback.format_exc())
-                self.print(Rule(characters='-', style=Style(color='#E33157')))
+                self.print(_SECTION_RULE)
                 raise
 
+        # ログイン状態によって視聴ページの内容 (webSocketUrl など) は変わるため、ログイン前に取得した視聴ページと番組情報のキャッシュを破棄する
+        self._watch_page_cache = None
+        self._program_info_cache = None
+
         # 現在 HTTP クライアントにセットされている Cookie を返す
         return dict(self.httpx_client.cookies.items())
 
@@ -226,24 +499,35 @@ class NDGRClient:
         }
 
         # クラスメソッドから self.httpx_client にはアクセスできないため、新しい httpx.AsyncClient を作成している
-        async with httpx.AsyncClient(headers=cls.HTTP_HEADERS, follow_redirects=True) as client:
+        async with httpx.AsyncClient(
+            headers = cls.HTTP_HEADERS,
+            follow_redirects = True,
+            http2 = True,
+            limits = cls.HTTP_LIMITS,
+            timeout = cls.HTTP_TIMEOUT,
+        ) as client:
 
             # まずは候補となるニコニコ生放送番組 ID を収集
             candidate_nicolive_program_ids: set[str] = set()
-            candidate_nicolive_program_ids.update(provisional_jikkyo_program_id_map.get(jikkyo_channel_id, []))
+            ## 暫定版ニコニコ実況の番組は運用期間外の日付に放送されていることはあり得ないため、運用期間内の日付が指定されたときのみ候補に含める
+            ## こうすることで、大半のケースで暫定版ニコニコ実況の番組情報を取得する無駄な API リクエストを省ける
+            if cls.PROVISIONAL_JIKKYO_PERIOD[0] <= date <= cls.PROVISIONAL_JIKKYO_PERIOD[1]:
+                candidate_nicolive_program_ids.update(provisional_jikkyo_program_id_map.get(jikkyo_channel_id, []))
+            ## 放送中番組のページと、過去番組一覧の 1 ページ目・2 ページ目は互いに依存しないため、並行して取得する
+            live_response, *past_lives_responses = await _run_concurrently([
+                client.get(cls.CHANNEL_LIVE_URL.format(jikkyo_channel_id)),
+                *(client.get(cls.CHANNEL_PAST_LIVES_URL.format(page, jikkyo_channel_id)) for page in range(1, 3)),
+            ])
             ## 放送中番組の ID を取得
-            response = await client.get(f'https://ch.nicovideo.jp/{jikkyo_channel_id}/live', timeout=15.0)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            live_now = soup.find('div', id='live_now')
-            if live_now:
-                live_link = live_now.find('a', href=lambda href: bool(href and href.startswith('https://live.nicovideo.jp/watch/lv')))  # type: ignore
-                if live_link:
-                    live_id = cast(str, cast(Tag, live_link).get('href')).split('/')[-1]
+            live_response.raise_for_status()
+            live_html = ET.HTML(live_response.content)
+            if live_html is not None:
+                live_hrefs: list[str] = _LIVE_NOW_PROGRAM_HREF_XPATH(live_html)  # type: ignore
+                if live_hrefs:
+                    live_id = live_hrefs[0].rpartition('/')[2]
                     candidate_nicolive_program_ids.add(live_id)
             ## 過去番組の ID をスクレイピングで取得
-            for page in range(1, 3):  # 1 ページ目と 2 ページ目を取得
-                response = await client.get(f'https://sp.ch.nicovideo.jp/api/past_lives/?page={page}&channel_id={jikkyo_channel_id}', timeout=15.0)
+            for page, response in enumerate(past_lives_responses, start=1):  # 1 ページ目と 2 ページ目を取得
                 if response.status_code != 200:
                     if page == 1:
                         # 1 ページは必ず取得できるはずなので、取得できなかった場合はニコ生側で何らかの問題が発生している
@@ -251,36 +535,71 @@ class NDGRClient:
                     else:
                         # 2 ページ目が取得できなかった場合はページを分けるほど過去の番組情報がないと考えられるため、ループを抜ける
                         break
-                soup = BeautifulSoup(response.content, 'html.parser')
-                for a_tag in soup.find_all('a', href=True):
-                    href = a_tag['href']
-                    if 'https://live.nicovideo.jp/watch/' in href:
-                        candidate_nicolive_program_ids.add(href.split('/')[-1])
-
-            # 候補となるニコニコ生放送番組の放送期間を取得
-            broadcast_periods: list[NicoLiveProgramBroadcastPeriod] = []
-            for program_id in candidate_nicolive_program_ids:
-                response = await client.get(f'https://api.cas.nicovideo.jp/v1/services/live/programs/{program_id}', timeout=15.0)
+                past_lives_html = ET.HTML(response.content)
+                if past_lives_html is None:
+                    continue
+                past_lives_hrefs: list[str] = _PAST_LIVES_PROGRAM_HREF_XPATH(past_lives_html)  # type: ignore
+                for href in past_lives_hrefs:
+                    candidate_nicolive_program_ids.add(href.rpartition('/')[2])
+
+            # 同時に実行する API リクエストの数を制限するためのセマフォ
+            semaphore = asyncio.Semaphore(cls.PROGRAM_INFO_FETCH_CONCURRENCY)
+
+            async def fetch_broadcast_period(program_id: str) -> NicoLiveProgramBroadcastPeriod | None:
+                """
+                ニコニコ生放送番組の放送期間を取得する
+                番組が存在しないかタイムシフト非公開の場合は None を返す
+                """
+
+                # 放送終了済みの番組の放送期間は変化しないため、以前取得した結果があればそれを使う
+                if program_id in _ENDED_PROGRAM_BROADCAST_PERIOD_CACHE:
+                    _ENDED_PROGRAM_BROADCAST_PERIOD_CACHE.move_to_end(program_id)
+                    cached_period = _ENDED_PROGRAM_BROADCAST_PERIOD_CACHE[program_id]
+                    if cached_period is None:
+                        return None
+                    return {'nicoliveProgramId': program_id, 'beginAt': cached_period[0], 'endAt': cached_period[1]}
+
+                async with semaphore:
+                    response = await client.get(cls.PROGRAM_INFO_API_URL.format(program_id))
                 # ごく稀にキャンセルされたなどで存在が抹消された番組もリストに含まれる場合があるので、その場合はスキップ
                 ## 例: lv346334901
                 if response.status_code == 404:
-                    continue
+                    return None
                 response.raise_for_status()
-                response_json = response.json()
+                response_json = orjson.loads(response.content)
                 assert 'data' in response_json
-                assert 'onAirTime' in response_json['data']
-                assert 'beginAt' in response_json['data']['onAirTime']
-                assert 'endAt' in response_json['data']['onAirTime']
-                assert 'timeshift' in response_json['data']
-                assert 'enabled' in response_json['data']['timeshift']
+                response_data = response_json['data']
+                assert 'onAirTime' in response_data
+                on_air_time = response_data['onAirTime']
+                assert 'beginAt' in on_air_time
+                assert 'endAt' in on_air_time
+                assert 'timeshift' in response_data
+                assert 'enabled' in response_data['timeshift']
+                begin_at = datetime.fromisoformat(on_air_time['beginAt'])
+                end_at = datetime.fromisoformat(on_air_time['endAt'])
+                timeshift_enabled = bool(response_data['timeshift']['enabled'])
+                # 放送終了済みの番組のみ、結果をキャッシュしておく
+                ## 放送中・放送予定の番組は延長などで放送期間が変わりうるため、キャッシュしない
+                if end_at <= datetime.now(end_at.tzinfo):
+                    _ENDED_PROGRAM_BROADCAST_PERIOD_CACHE[program_id] = (begin_at, end_at) if timeshift_enabled else None
+                    _ENDED_PROGRAM_BROADCAST_PERIOD_CACHE.move_to_end(program_id)
+                    while len(_ENDED_PROGRAM_BROADCAST_PERIOD_CACHE) > cls.ENDED_PROGRAM_BROADCAST_PERIOD_CACHE_MAX_SIZE:
+                        _ENDED_PROGRAM_BROADCAST_PERIOD_CACHE.popitem(last=False)
                 # タイムシフト非公開の番組からはコメントを取得できないのでスキップ
-                if not response_json['data']['timeshift']['enabled']:
-                    continue
-                broadcast_periods.append({
+                if not timeshift_enabled:
+                    return None
+                return {
                     'nicoliveProgramId': program_id,
-                    'beginAt': datetime.fromisoformat(response_json['data']['onAirTime']['beginAt']),
-                    'endAt': datetime.fromisoformat(response_json['data']['onAirTime']['endAt']),
-                })
+                    'beginAt': begin_at,
+                    'endAt': end_at,
+                }
+
+            # 候補となるニコニコ生放送番組の放送期間を並行して取得
+            broadcast_periods: list[NicoLiveProgramBroadcastPeriod] = [
+                period for period in await _run_concurrently(
+                    fetch_broadcast_period(program_id) for program_id in candidate_nicolive_program_ids
+                ) if period is not None
+            ]
 
         # 指定された日付に放送されている番組をフィルタリング
         broadcast_periods = [
@@ -320,11 +639,8 @@ class NDGRClient:
                 # すでに放送を終了した番組はストリーミングを開始できない
                 ## 厳密には NDGR の各 API に接続することはできるが、当然新規にコメントが降ってくることはなく、過去ログ参照のみ
                 raise ValueError(f'Program {nicolive_program_info.nicoliveProgramId} has already ended and cannot be streamed.')
-            self.print(f'Title:  {nicolive_program_info.title} [{nicolive_program_info.status}] ({nicolive_program_info.nicoliveProgramId})')
-            self.print(f'Period: {datetime.fromtimestamp(nicolive_program_info.openTime).strftime("%Y-%m-%d %H:%M:%S")} ~ '
-                       f'{datetime.fromtimestamp(nicolive_program_info.endTime).strftime("%Y-%m-%d %H:%M:%S")} '
-                       f'({datetime.fromtimestamp(nicolive_program_info.endTime) - datetime.fromtimestamp(nicolive_program_info.openTime)}h)')
-            self.print(Rule(characters='-', style=Style(color='#E33157')))
+            self.__printProgramInfo(nicolive_program_info)
+            self.print(_SECTION_RULE)
             view_api_uri = await self.fetchNDGRViewURI(nicolive_program_info.webSocketUrl)
 
             # NDGR View API への初回アクセスかどうかを表すフラグ
@@ -333,7 +649,9 @@ class NDGRClient:
             ready_for_next: chat.ChunkedEntry.ReadyForNext | None = None
 
             # fetch_chunked_message() で受信したコメントを yield で返すための Queue
-            comment_queue: asyncio.Queue[NDGRComment] = asyncio.Queue()
+            ## コメントの取り出しが追いつかない場合にメモリを際限なく消費しないよう、上限を設けている
+            ## 上限に達すると fetch_chunked_message() 側の put() が待機し、NDGR Segment API からの読み取りも自然と待機する
+            comment_queue: asyncio.Queue[NDGRComment] = asyncio.Queue(maxsize=self.COMMENT_QUEUE_MAX_SIZE)
             # アクティブな ChunkedMessage 受信タスクを格納する辞書
             active_segments: dict[str, asyncio.Task[None]] = {}
 
@@ -351,8 +669,14 @@ class NDGRClient:
 
                 # 毎分 05 秒に実行
                 ## 00 秒ちょうどにアクセスするとギリギリ変更反映前のデータを取得してしまう可能性があるため、敢えて 5 秒待っている
+                ## 次回の実行時刻を UNIX タイムスタンプで保持し、そこまでの残り時間だけ待機する
+                next_run_at = math.ceil(time.time() / 60) * 60 + 5
                 while True:
-                    await asyncio.sleep(60 - datetime.now().second % 60 + 5)
+                    await asyncio.sleep(max(0.0, next_run_at - time.time()))
+                    # 番組情報の取得に時間がかかった場合でも、次回の実行時刻が常に未来の毎分 05 秒になるようにする
+                    now = time.time()
+                    while next_run_at <= now:
+                        next_run_at += 60
                     try:
                         # 視聴ページから self.nicolive_id に対応する現在の番組ステータスを取得する
                         new_nicolive_program_info = await self.fetchNicoLiveProgramInfo()
@@ -378,7 +702,7 @@ class NDGRClient:
                     except Exception:
                         self.print('Error fetching program info:')
                         self.print(traceback.format_exc())
-                        self.print(Rule(characters='-', style=Style(color='#E33157')))
+                        self.print(_SECTION_RULE)
 
             async def fetch_chunked_entries() -> None:
                 """
@@ -392,18 +716,18 @@ class NDGRClient:
                     # 状態次第で NDGR View API の ?at= に渡すタイムスタンプを決定する
                     # 初回アクセス時は ?at=now を指定する
                     # 次回アクセス時は ?at= に ChunkedEntry.ReadyForNext.at に設定されている UNIX タイムスタンプを指定する
-                    at: str | None = None
+                    at: int | str | None = None
                     if ready_for_next is not None:
-                        at = str(ready_for_next.at)
+                        at = ready_for_next.at
                     elif is_first_time:
                         at = 'now'
                         is_first_time = False
 
                     ready_for_next = None
 
-                    # NDGR View API への接続が失敗した場合は 3 回リトライする
+                    # NDGR View API への接続が失敗した場合は、待機時間を倍々に伸ばしながら VIEW_API_MAX_RETRIES 回まで試行する
                     retry_count = 0
-                    while retry_count < 3:
+                    while True:
                         try:
                             async for chunked_entry in self.fetchChunkedEntries(view_api_uri, at):
 
@@ -416,12 +740,15 @@ class NDGRClient:
                                     # セグメントの配信開始時刻と配信終了時刻の UNIX タイムスタンプを取得
                                     ## セグメントには配信開始時刻より前から接続できる
                                     segment = chunked_entry.segment
-                                    segment_from = segment.from_.seconds + (segment.from_.nanos / 1e9)
-                                    segment_until = segment.until.seconds + (segment.until.nanos / 1e9)
-                                    self.print(f'[{datetime.now().strftime("%Y/%m/%d %H:%M:%S.%f")}] '
-                                               f'Segment From: {datetime.fromtimestamp(segment_from).strftime("%H:%M:%S")} / '
-                                               f'Segment Until: {datetime.fromtimestamp(segment_until).strftime("%H:%M:%S")}', verbose_log=True)
-                                    self.print(Rule(characters='-', style=Style(color='#E33157')), verbose_log=True)
+                                    ## 詳細な動作ログが無効なときはログ文字列の生成自体を省略する
+                                    if self.verbose is True:
+                                        ## ログには秒単位までしか出力しないため、秒未満 (nanos) を浮動小数点数で足し合わせる必要はない
+                                        ## datetime オブジェクトを経由せず、time.localtime() と time.strftime() で直接フォーマットする
+                                        segment_from = time.strftime('%H:%M:%S', time.localtime(segment.from_.seconds))
+                                        segment_until = time.strftime('%H:%M:%S', time.localtime(segment.until.seconds))
+                                        self.print(f'[{datetime.now().strftime("%Y/%m/%d %H:%M:%S.%f")}] '
+                                                   f'Segment From: {segment_from} / Segment Until: {segment_until}', verbose_log=True)
+                                        self.print(_SECTION_RULE, verbose_log=True)
 
                                     # すでに同一 URI の ChunkedMessage 受信タスクが存在する場合は、
                                     # 新しいタスクを作成せずに既存のタスクを継続して使用する
@@ -429,7 +756,7 @@ class NDGRClient:
                                         # 新しい ChunkedMessage 受信タスクを作成し、開始
                                         task = asyncio.create_task(fetch_chunked_message(segment))
                                         active_segments[segment.uri] = task
-                                    else:
+                                    elif self.verbose is True:
                                         self.print(f'Task for segment URI {segment.uri} is already running. Skipping creation of new task.', verbose_log=True)
 
                                 # 次回の NDGR View API アクセス用タイムスタンプを取得
@@ -441,14 +768,29 @@ class NDGRClient:
 
                         except KeyboardInterrupt:
                             raise
-                        except Exception:
+                        except Exception as ex:
                             self.print('Error fetching chunked entries:')
                             self.print(traceback.format_exc())
-                            self.print(Rule(characters='-', style=Style(color='#E33157')))
+                            self.print(_SECTION_RULE)
+
+                            # リトライで復旧し得るのは、ネットワークエラー・タイムアウトと 5xx / 408 / 429 の HTTP エラーのみ
+                            ## それ以外の 4xx や Protobuf のデコードエラー (ValueError / AssertionError など) はリトライしても結果が変わらないため、即座に例外を投げる
+                            is_retryable = isinstance(ex, httpx.TransportError) or (
+                                isinstance(ex, httpx.HTTPStatusError) and
+                                (ex.response.status_code >= 500 or ex.response.status_code in (408, 429))
+                            )
+                            if is_retryable is False:
+                                raise
                             retry_count += 1
-                            if retry_count >= 3:
-                                raise  # 3回リトライしても失敗したら継続を諦めて例外を投げる
-                            await asyncio.sleep(1)  # 1秒待ってリトライ
+                            if retry_count >= self.VIEW_API_MAX_RETRIES:
+                                raise  # 最大回数までリトライしても失敗したら継続を諦めて例外を投げる
+
+                            # 複数のクライアントが同時に失敗した際に一斉にリトライしないよう、待機時間に揺らぎを持たせる
+                            retry_delay = min(
+                                self.VIEW_API_MIN_RETRY_DELAY * (2 ** retry_count) + random.uniform(0, self.VIEW_API_RETRY_JITTER),
+                                self.VIEW_API_MAX_RETRY_DELAY,
+                            )
+                            await asyncio.sleep(retry_delay)
 
                     # chunked_entry.next が設定されていない場合は放送が終了したとみなす
                     if ready_for_next is None:
@@ -461,15 +803,20 @@ class NDGRClient:
                 この関数は fetch_chunked_entries() からバックグラウンド実行される
                 """
 
+                # コメントごとに実行されるため、メソッドの参照をローカル変数に束縛しておく
+                put_comment = comment_queue.put
+                verbose = self.verbose
                 try:
                     async for comment in self.fetchChunkedMessages(segment.uri):
-                        await comment_queue.put(comment)
+                        await put_comment(comment)
+                        if verbose is True and comment_queue.qsize() > self.COMMENT_QUEUE_WARNING_SIZE:
+                            self.print(f'Comment queue is backing up. ({comment_queue.qsize()} comments pending)', verbose_log=True)
                 except KeyboardInterrupt:
                     raise
                 except Exception:
                     self.print('Error fetching chunked messages:')
                     self.print(traceback.format_exc())
-                    self.print(Rule(characters='-', style=Style(color='#E33157')))
+                    self.print(_SECTION_RULE)
                 finally:
                     # 配信終了時刻を過ぎて ChunkedMessage 受信が完了したらアクティブリストから削除
                     active_segments.pop(segment.uri, None)
@@ -478,35 +825,48 @@ class NDGRClient:
             program_info_task = asyncio.create_task(fetch_program_info())
             chunked_entries_task = asyncio.create_task(fetch_chunked_entries())
 
+            # コメントキューからコメントを取り出すタスク
+            ## コメントごとに新しいタスクを作成するとコメント数に比例してタスクの生成・破棄のコストがかかるため、
+            ## 1 つのタスクを待機し続け、コメントを取り出せたときだけ次のタスクを作成する
+            comment_getter_task: asyncio.Task[NDGRComment] = asyncio.create_task(comment_queue.get())
+            # コメントごとに実行されるため、メソッドの参照をローカル変数に束縛しておく
+            ## comment_queue.join() で待機する箇所はないため、task_done() は呼び出さない
+            get_comment = comment_queue.get
+            get_comment_nowait = comment_queue.get_nowait
+
             try:
                 while True:
                     # コメントキューからコメントを取り出すタスクと番組情報状態監視タスクを同時に待機し、どちらかが完了するまで待機
                     ## 大半のケースでコメントキューの方が早く完了する (コメントは多い時だと 0.01 秒間隔で降ってくるため)
                     done, _ = await asyncio.wait(
-                        [asyncio.create_task(comment_queue.get()), program_info_task],
+                        [comment_getter_task, program_info_task],
                         return_when = asyncio.FIRST_COMPLETED,
                     )
 
-                    # 先に完了した方のタスクを処理
-                    for task in done:
-
-                        # 番組情報状態監視タスクが先に完了した: 現在コメント受信中の番組の放送が終了した
-                        if task is program_info_task:
-                            result = cast(Literal['ENDED', 'RESTART'], task.result())
-                            # ここで ENDED (処理終了) または RESTART (次の番組へ移行) を返した時点で
-                            ## stream_comments_inner() での処理は終了する
-                            if result == 'ENDED':
-                                self.print('Program Ended. Stopping...')
-                            elif result == 'RESTART':
-                                self.print('Program Ended. Switching to Next Program...')
-                            self.print(Rule(characters='-', style=Style(color='#E33157')))
-                            yield result
-
-                        # コメントキューから受信したコメントを取得して yield で返す
-                        else:
-                            comment = cast(NDGRComment, await task)
+                    # コメントキューから受信したコメントを取得して yield で返す
+                    if comment_getter_task in done:
+                        yield comment_getter_task.result()
+                        # 既にキューに溜まっているコメントは、asyncio.wait() を経由せずにまとめて取り出して yield で返す
+                        ## 次のコメント取り出しタスクは、コメントの順序が入れ替わらないようキューを空にしてから作成する
+                        while True:
+                            try:
+                                comment = get_comment_nowait()
+                            except asyncio.QueueEmpty:
+                                break
                             yield comment
-                            comment_queue.task_done()
+                        comment_getter_task = asyncio.create_task(get_comment())
+
+                    # 番組情報状態監視タスクが先に完了した: 現在コメント受信中の番組の放送が終了した
+                    if program_info_task in done:
+                        result = program_info_task.result()
+                        # ここで ENDED (処理終了) または RESTART (次の番組へ移行) を返した時点で
+                        ## stream_comments_inner() での処理は終了する
+                        if result == 'ENDED':
+                            self.print('Program Ended. Stopping...')
+                        elif result == 'RESTART':
+                            self.print('Program Ended. Switching to Next Program...')
+                        self.print(_SECTION_RULE)
+                        yield result
             finally:
 
                 # すべてのアクティブな ChunkedMessage 受信タスクをキャンセル
@@ -514,22 +874,25 @@ class NDGRClient:
                     task.cancel()
                 chunked_entries_task.cancel()
                 program_info_task.cancel()
+                comment_getter_task.cancel()
 
                 # タスクが完全に終了するのを待つ
-                await asyncio.gather(chunked_entries_task, program_info_task, *active_segments.values(), return_exceptions=True)
+                await asyncio.gather(chunked_entries_task, program_info_task, comment_getter_task, *active_segments.values(), return_exceptions=True)
 
         # コメント受信処理を開始
         while True:
-            async for comment in stream_comments_inner():
-                # comment が 'ENDED' のときはこのメソッドでの処理を終了
-                if comment == 'ENDED':
-                    return
-                # comment が 'RESTART' のときは一度ジェネレータを中断し、新たに stream_comments_inner() を呼び出す
-                elif comment == 'RESTART':
-                    break  # ここで break すると外側の while True: ループに戻る
-                # comment が NDGRComment のときは yield する
-                else:
-                    yield comment
+            # ループを抜けた時点で stream_comments_inner() を確実に終了させ、バックグラウンドタスクをキャンセルさせる
+            async with contextlib.aclosing(stream_comments_inner()) as comments:
+                async for comment in comments:
+                    # comment が 'ENDED' のときはこのメソッドでの処理を終了
+                    if comment == 'ENDED':
+                        return
+                    # comment が 'RESTART' のときは一度ジェネレータを中断し、新たに stream_comments_inner() を呼び出す
+                    elif comment == 'RESTART':
+                        break  # ここで break すると外側の while True: ループに戻る
+                    # comment が NDGRComment のときは yield する
+                    else:
+                        yield comment
 
 
     async def downloadBackwardComments(self) -> list[NDGRComment]:
@@ -546,11 +909,9 @@ class NDGRClient:
 
         # 視聴ページから NDGR View API の URI を取得する
         nicolive_program_info = await self.fetchNicoLiveProgramInfo()
-        self.print(f'Title:  {nicolive_program_info.title} [{nicolive_program_info.status}] ({nicolive_program_info.nicoliveProgramId})')
-        self.print(f'Period: {datetime.fromtimestamp(nicolive_program_info.openTime).strftime("%Y-%m-%d %H:%M:%S")} ~ '
-                   f'{datetime.fromtimestamp(nicolive_program_info.endTime).strftime("%Y-%m-%d %H:%M:%S")} '
-                   f'({datetime.fromtimestamp(nicolive_program_info.endTime) - datetime.fromtimestamp(nicolive_program_info.openTime)}h)')
-        self.print(Rule(characters='-', style=Style(color='#E33157')), verbose_log=True)
+        self.__printProgramInfo(nicolive_program_info)
+        if self.verbose is True:
+            self.print(_SECTION_RULE, verbose_log=True)
         view_api_uri = await self.fetchNDGRViewURI(nicolive_program_info.webSocketUrl)
 
         # NDGR View API への初回アクセスかどうかを表すフラグ
@@ -560,7 +921,9 @@ class NDGRClient:
         # 過去のコメントを取得するための NDGR Backward API の URI
         backward_api_uri: str | None = None
         # コメントリスト
-        comments: list[NDGRComment] = []
+        ## NDGR Backward API からは新しいページから順に取得するため、取得したページのコメントは常に先頭側に追加していく
+        ## list の連結では追加のたびに全コメントをコピーし直すことになるため、先頭への追加が O(1) の deque に溜める
+        comments: deque[NDGRComment] = deque()
 
         # NDGR View API の持続期間は一定期間ごとに区切られているらしく、
         # 一定期間が経過すると next フィールドに設定されている次の NDGR View API への再接続を求められる
@@ -569,58 +932,38 @@ class NDGRClient:
             # 状態次第で NDGR View API の ?at= に渡すタイムスタンプを決定する
             # 初回アクセス時は ?at=now を指定する
             # 次回アクセス時は ?at= に ChunkedEntry.ReadyForNext.at に設定されている UNIX タイムスタンプを指定する
-            at: str | None = None
+            at: int | str | None = None
             if ready_for_next is not None:
-                at = str(ready_for_next.at)
+                at = ready_for_next.at
             elif is_first_time:
                 at = 'now'
                 is_first_time = False
 
-            # イベントを作成して、backward_api_uri が見つかったら設定する
-            backward_api_uri_found = asyncio.Event()
-
             async def process_chunked_entries() -> str | None:
                 """
                 ChunkedEntry の受信を処理する非同期ジェネレータ関数
                 ChunkedEntry には、NDGR Segment API / NDGR Backward API など複数の API のアクセス先 URI が含まれる
                 """
 
-                nonlocal ready_for_next, backward_api_uri, backward_api_uri_found
-                async for chunked_entry in self.fetchChunkedEntries(view_api_uri, at):
+                nonlocal ready_for_next
+                ## backward フィールドを見つけた時点で途中で抜けるため、NDGR View API へのストリーミング接続を確実に閉じる
+                async with contextlib.aclosing(self.fetchChunkedEntries(view_api_uri, at)) as chunked_entries:
+                    async for chunked_entry in chunked_entries:
 
-                    # next フィールドがが設定されているとき、NDGR View API への次回アクセス時に ?at= に指定するタイムスタンプ
-                    # (が格納された ChunkedEntry.ReadyForNext) を更新する
-                    if chunked_entry.HasField('next'):
-                        assert ready_for_next is None, 'Duplicated ReadyForNext'
-                        ready_for_next = chunked_entry.next
+                        # next フィールドがが設定されているとき、NDGR View API への次回アクセス時に ?at= に指定するタイムスタンプ
+                        # (が格納された ChunkedEntry.ReadyForNext) を更新する
+                        if chunked_entry.HasField('next'):
+                            assert ready_for_next is None, 'Duplicated ReadyForNext'
+                            ready_for_next = chunked_entry.next
 
-                    # backward フィールドがが設定されているとき、BackwardSegment.segment.uri から NDGR Backward API の URI を取得する
-                    elif chunked_entry.HasField('backward'):
-                        backward_api_uri = chunked_entry.backward.segment.uri
-                        backward_api_uri_found.set()  # イベントを設定して、ループを終了させる
-                        return backward_api_uri
+                        # backward フィールドがが設定されているとき、BackwardSegment.segment.uri から NDGR Backward API の URI を取得する
+                        elif chunked_entry.HasField('backward'):
+                            return chunked_entry.backward.segment.uri
 
                 return None
 
-            # NDGR View API から ChunkedEntry の受信を開始する非同期タスクを作成
-            read_task = asyncio.create_task(process_chunked_entries())
-
-            # backward_api_uri が見つかるか、self.readProtobufStream() が完了するまで待機
-            done, pending = await asyncio.wait(
-                [read_task, asyncio.create_task(backward_api_uri_found.wait())],
-                return_when = asyncio.FIRST_COMPLETED,
-            )
-
-            # 完了していないタスクをキャンセル
-            for task in pending:
-                task.cancel()
-
-            # read_task の結果を取得
-            ## 本来ここで再度設定する必要はないが、このスコープで backward_api_uri を設定しないと
-            ## 2024/08/31 時点での Pylance が到達不能コード扱いしてくるので、やむを得ずこうしている
-            for task in done:
-                if task is read_task:
-                    backward_api_uri = cast(str | None, task.result())
+            # NDGR View API から ChunkedEntry を受信し、NDGR Backward API の URI が見つかるかストリームが終了するまで待機
+            backward_api_uri = await process_chunked_entries()
 
             # backward_api_uri が取得できたらループを抜ける
             if backward_api_uri is not None:
@@ -630,60 +973,121 @@ class NDGRClient:
         if not backward_api_uri:
             return []
 
-        # NDGR Backward API から過去のコメントを PackedSegment 型で取得
-        while True:
-            self.print(f'Retrieving {backward_api_uri} ...', verbose_log=True)
-            self.print(Rule(characters='-', style=Style(color='#E33157')), verbose_log=True)
-            response = await self.httpx_client.get(backward_api_uri, timeout=15.0)
-            response.raise_for_status()
-            packed_segment = chat.PackedSegment()
-            packed_segment.ParseFromString(response.content)
+        # NDGR Backward API へのアクセス制限時に連続してリトライした回数
+        backward_retry_count = 0
 
-            # PackedSegment.messages には複数の ChunkedMessage が格納されている
-            ## この ChunkedMessage は取得時点でコメント投稿時刻昇順でソートされている
-            ## このメソッドでもレスポンスはコメント投稿時刻昇順で返したいので、comments への追加方法を工夫している
-            temp_comments: list[NDGRComment] = []
-            for chunked_message in packed_segment.messages:
+        # NDGR Backward API から過去のコメントを PackedSegment 型で取得
+        ## PackedSegment のインスタンスはページごとに作り直さず使い回す (ParseFromString() は内部で既存の内容をクリアしてからパースする)
+        packed_segment = chat.PackedSegment()
 
-                # meta または message が存在しない場合は空の ChunkedMessage なので無視する
-                if not chunked_message.HasField('meta') or not chunked_message.HasField('message'):
-                    continue
-                # NicoLiveMessage の中に chat or overflowed_chat がない場合は運営コメントや市場などコメント以外のメッセージなので無視する
-                # 通常のコメントであればどちらかは必ず存在するはず
-                if not chunked_message.message.HasField('chat') and not chunked_message.message.HasField('overflowed_chat'):
-                    continue
-                # Chat の中に Modifier がない場合 (存在するのか？) はコメントの位置や色などの情報が取れないのでとりあえず無視する
-                if chunked_message.message.HasField('chat'):
-                    message_chat = chunked_message.message.chat
+        async def fetch_packed_segment(uri: str) -> httpx.Response:
+            """
+            NDGR Backward API から PackedSegment を取得する
+            """
+            if self.verbose is True:
+                self.print(f'Retrieving {uri} ...', verbose_log=True)
+                self.print(_SECTION_RULE, verbose_log=True)
+            return await self.httpx_client.get(uri)
+
+        # 先読み中の次のページの取得タスク
+        prefetch_task: asyncio.Task[httpx.Response] | None = None
+        try:
+            while True:
+                # 前のページの処理中に先読みしておいたレスポンスがあればそれを使い、なければここでリクエストする
+                if prefetch_task is not None:
+                    response = await prefetch_task
+                    prefetch_task = None
                 else:
-                    message_chat = chunked_message.message.overflowed_chat
-                if not message_chat.HasField('modifier'):
+                    response = await fetch_packed_segment(backward_api_uri)
+
+                # 短時間に大量アクセスしてアクセス制限 (403 / 429) を受けた場合は、待機時間を倍々に伸ばしながら同じ URI をリトライする
+                ## ニコニコ生放送 (Re:仮) ではアクセス制限が厳しめだったが、今はそんなに待たなくても規制されないっぽいので、
+                ## 以前のように毎回固定で待機するのではなく、実際に制限を受けたときだけ待機するようにしている
+                if response.status_code in (403, 429):
+                    backward_retry_count += 1
+                    if backward_retry_count > self.BACKWARD_API_MAX_RETRIES:
+                        response.raise_for_status()  # 規定回数リトライしても制限が解除されない場合は例外を投げる
+                    self._backward_backoff = min(max(self._backward_backoff * 2, self.BACKWARD_API_MIN_BACKOFF), self.BACKWARD_API_MAX_BACKOFF)
+                    ## サーバーが Retry-After ヘッダーで待機秒数を指定してきた場合は、少なくともその秒数だけ待機する
+                    retry_after = response.headers.get('retry-after', '')
+                    if retry_after.isdecimal():
+                        self._backward_backoff = min(max(self._backward_backoff, float(retry_after)), self.BACKWARD_API_MAX_BACKOFF)
+                    ## 複数のクライアントが同時に制限を受けた際に、同じタイミングで一斉にリトライしないよう、待機時間に揺らぎを持たせる
+                    retry_delay = self._backward_backoff * random.uniform(1.0, 1.0 + self.BACKWARD_API_BACKOFF_JITTER)
+                    self.print(f'Rate limited by NDGR Backward API (HTTP Error {response.status_code}). Retrying in {retry_delay:.2f} seconds...')
+                    await asyncio.sleep(retry_delay)
                     continue
-
-                # 取り回しやすいように NDGRComment Pydantic モデルに変換
-                comment = self.convertToNDGRComment(chunked_message)
-                temp_comments.append(comment)
-                self.print(str(comment), verbose_log=True)
-                self.print(Rule(characters='-', style=Style(color='#E33157')), verbose_log=True)
-
-            # 現在の comments の前側に temp_comments の内容を連結
-            comments = temp_comments + comments
-            self.print(f'Retrieved a total of {len(comments)} comments.', end='\r')  # 進捗ログを上書きする
-
-            # next フィールドが設定されていれば、続けて過去のコメントを取得
-            if packed_segment.HasField('next'):
-                # NDGR Backward API の URI を次のコメント取得用に更新
-                backward_api_uri = packed_segment.next.uri
-            else:
-                break
-
-            # 短時間に大量アクセスすると 403 を返される可能性があるので、0.01 秒待つ
-            ## ニコニコ生放送 (Re:仮) ではアクセス制限が厳しめだったが、今はそんなに待たなくても規制されないっぽい
-            await asyncio.sleep(0.01)
+                response.raise_for_status()
+                backward_retry_count = 0
+                packed_segment.ParseFromString(response.content)
+
+                # 次のページがあれば、このページのコメントを変換している間に次のページの取得を先行して開始する
+                ## ネットワークの待ち時間と Protobuf のパースやコメントの変換処理を重ねることで、全体の所要時間を短縮する
+                ## アクセス制限を受けて待機時間が設定されている間は先読みせず、1 ページずつ順番に取得する
+                if packed_segment.HasField('next') and self._backward_backoff == 0:
+                    prefetch_task = asyncio.create_task(fetch_packed_segment(packed_segment.next.uri))
+
+                # PackedSegment.messages には複数の ChunkedMessage が格納されている
+                ## この ChunkedMessage は取得時点でコメント投稿時刻昇順でソートされている
+                ## このメソッドでもレスポンスはコメント投稿時刻昇順で返したいので、comments への追加方法を工夫している
+                temp_comments: list[NDGRComment] = []
+                for index, chunked_message in enumerate(packed_segment.messages):
+
+                    # 先読みタスクが HTTP リクエストの送信やレスポンスの受信を進められるよう、一定件数ごとにイベントループに制御を返す
+                    ## この変換処理は await を含まないため、制御を返さないと変換が終わるまで先読みタスクがまったく進まない
+                    if index % self.BACKWARD_API_PREFETCH_YIELD_INTERVAL == 0:
+                        await asyncio.sleep(0)
+
+                    # NDGRComment に変換できない ChunkedMessage は無視する
+                    if not self.__isConvertibleToNDGRComment(chunked_message):
+                        continue
+
+                    # 取り回しやすいように NDGRComment Pydantic モデルに変換
+                    comment = self.convertToNDGRComment(chunked_message)
+                    temp_comments.append(comment)
+                    # 詳細な動作ログが無効なときは、コメントごとの文字列化や Rule の生成自体を省略する
+                    if self.verbose is True:
+                        self.print(str(comment), verbose_log=True)
+                        self.print(_SECTION_RULE, verbose_log=True)
+
+                # 現在の comments の前側に temp_comments の内容を連結
+                ## extendleft() は要素を 1 つずつ先頭に追加するため、投稿時刻昇順を保つよう逆順にして渡す
+                comments.extendleft(reversed(temp_comments))
+                self.print(f'Retrieved a total of {len(comments)} comments.', end='\r')  # 進捗ログを上書きする
+
+                # next フィールドが設定されていれば、続けて過去のコメントを取得
+                if packed_segment.HasField('next'):
+                    # NDGR Backward API の URI を次のコメント取得用に更新
+                    backward_api_uri = packed_segment.next.uri
+                else:
+                    break
+
+                # アクセス制限を受けた後は、成功するごとに待機時間を半分に減らしながら待機する
+                ## 待機時間が最小値を下回ったら、以降は待機せずに連続して取得する
+                if self._backward_backoff > 0:
+                    self._backward_backoff /= 2
+                    if self._backward_backoff < self.BACKWARD_API_MIN_BACKOFF:
+                        self._backward_backoff = 0.0
+                    else:
+                        await asyncio.sleep(self._backward_backoff)
+        finally:
+            # 例外などでループを抜けた場合は、先読み中のタスクをキャンセルする
+            ## キャンセル後にタスクの完了を待つことで、実行中の HTTP リクエストがこのメソッドの終了後まで残らないようにする
+            ## 先読みが既に失敗していた場合も、ここで例外を回収しておかないと "Task exception was never retrieved" が出力される
+            ## 回収した先読みの例外は送出せず、ループを抜ける原因になった例外をそのまま伝播させる
+            if prefetch_task is not None:
+                prefetch_task.cancel()
+                await asyncio.wait({prefetch_task})
+                if not prefetch_task.cancelled():
+                    prefetch_task.exception()
+                # 先読みの完了を待っている間にこのメソッドを実行しているタスク自体がキャンセルされた場合は、そのキャンセルを握りつぶさずに伝播させる
+                current_task = asyncio.current_task()
+                if current_task is not None and current_task.cancelling() > 0:
+                    raise asyncio.CancelledError
 
         self.print('')  # 最終行の進捗ログを消さないように改行する
-        self.print(Rule(characters='-', style=Style(color='#E33157')))
-        return comments
+        self.print(_SECTION_RULE)
+        return list(comments)
 
 
     async def fetchNicoLiveProgramInfo(self) -> NicoLiveProgramInfo:
@@ -699,21 +1103,14 @@ class NDGRClient:
             AssertionError: 解析に失敗した場合
         """
 
-        watch_page_url = f'https://live.nicovideo.jp/watch/{self.nicolive_id}'
-        reserve_response = await self.httpx_client.get(watch_page_url, timeout=15.0)
-        reserve_response.raise_for_status()
-
-        soup = BeautifulSoup(reserve_response.text, 'html.parser')
-        embedded_data_elm = soup.find(id='embedded-data')
-        assert isinstance(embedded_data_elm, Tag)
-        props = embedded_data_elm.get('data-props')
-        assert isinstance(props, str)
-        embedded_data = json.loads(props)
-        assert isinstance(embedded_data, dict)
-        assert 'program' in embedded_data
-        assert 'site' in embedded_data
-        assert 'relive' in embedded_data['site']
+        # 同じ分のうちに取得済みの番組情報があれば、視聴ページを再取得せずにそれを返す
+        ## streamComments() での初回取得と毎分の状態監視、downloadBackwardComments() での取得が重なった際の重複アクセスを避ける
+        ## 番組情報の変化はもともと毎分 05 秒の状態監視でしか検知していないため、分単位で使い回しても検知の遅れは最大 1 分に収まる
+        cache_key = (self.nicolive_id, int(time.time() // 60))
+        if self._program_info_cache is not None and self._program_info_cache[0] == cache_key:
+            return self._program_info_cache[1]
 
+        embedded_data = await self.__fetchWatchPageEmbeddedData()
         program_info = NicoLiveProgramInfo(
             nicoliveProgramId = embedded_data['program']['nicoliveProgramId'],
             title = embedded_data['program']['title'],
@@ -735,19 +1132,24 @@ class NDGRClient:
 
             # タイムシフト予約を実行
             api_url = f'https://live2.nicovideo.jp/api/v2/programs/{program_info.nicoliveProgramId}/timeshift/reservation'
-            reserve_response = await self.httpx_client.post(api_url, headers={'x-frontend-id': '9'}, timeout=15.0)
+            reserve_response = await self.httpx_client.post(api_url, headers={'x-frontend-id': '9'})
             ## meta.errorCode が "DUPLICATED" の場合は既にタイムシフト予約済みなので無視する
             if reserve_response.status_code != 200 and reserve_response.json().get('meta', {}).get('errorCode') != 'DUPLICATED':
                 raise ValueError(f'Failed to reserve timeshift. (HTTP Error {reserve_response.status_code}) Are you premium member?')
 
             # タイムシフト視聴を開始
             ## この API の実行後、ニコニコ生放送の視聴ページから webSocketUrl が取得できるようになる
-            start_watching_response = await self.httpx_client.patch(api_url, headers={'x-frontend-id': '9'}, timeout=15.0)
+            start_watching_response = await self.httpx_client.patch(api_url, headers={'x-frontend-id': '9'})
             if start_watching_response.status_code != 200:
                 raise ValueError(f'Failed to start timeshift watching. (HTTP Error {start_watching_response.status_code}) Are you premium member?')
 
             # 再度ニコニコ生放送の視聴ページから webSocketUrl を取得
-            program_info = await self.fetchNicoLiveProgramInfo()
+            ## 変化するのは webSocketUrl のみなので、NicoLiveProgramInfo は作り直さずに webSocketUrl だけを差し替える
+            ## タイムシフト予約前に取得した視聴ページに対する条件付きリクエストで 304 が返ると webSocketUrl が空のままになるため、
+            ## 視聴ページのキャッシュを破棄し、必ず視聴ページ全体を取得し直す
+            self._watch_page_cache = None
+            embedded_data = await self.__fetchWatchPageEmbeddedData()
+            program_info = program_info.model_copy(update={'webSocketUrl': embedded_data['site']['relive']['webSocketUrl']})
             if program_info.webSocketUrl == '':
                 raise ValueError('Failed to get webSocketUrl after timeshift reservation and start watching.')
             self.print('Timeshift watching has started.', verbose_log=True)
@@ -755,9 +1157,73 @@ class NDGRClient:
         # 上記条件以外で webSocketUrl が空文字列の場合は例外を送出…すると streamComments() での再接続処理に問題が出るため、行わない
         # エラー処理は各自で行う必要がある
 
+        self._program_info_cache = (cache_key, program_info)
         return program_info
 
 
+    async def __fetchWatchPageEmbeddedData(self) -> dict[str, Any]:
+        """
+        ニコニコ生放送の視聴ページを取得し、embedded-data の data-props に埋め込まれた JSON をパースして返す
+
+        Returns:
+            dict[str, Any]: 視聴ページの embedded-data
+
+        Raises:
+            httpx.HTTPStatusError: HTTP リクエストが失敗した場合
+            AssertionError: 解析に失敗した場合
+        """
+
+        # 前回取得した視聴ページに ETag / Last-Modified ヘッダーが付いていた場合は、条件付きリクエストを送る
+        ## 視聴ページの内容が変わっていなければ 304 Not Modified が返るため、HTML の転送と解析を省略して前回の embedded-data を返す
+        watch_page_url = f'https://live.nicovideo.jp/watch/{self.nicolive_id}'
+        request_headers: dict[str, str] = {}
+        cached_embedded_data: dict[str, Any] | None = None
+        if self._watch_page_cache is not None and self._watch_page_cache[0] == watch_page_url:
+            _, etag, last_modified, cached_embedded_data = self._watch_page_cache
+            if etag is not None:
+                request_headers['if-none-match'] = etag
+            if last_modified is not None:
+                request_headers['if-modified-since'] = last_modified
+        response = await self.httpx_client.get(watch_page_url, headers=request_headers)
+        if response.status_code == 304 and cached_embedded_data is not None:
+            return cached_embedded_data
+        response.raise_for_status()
+
+        # 視聴ページの HTML から embedded-data の data-props 属性の値を正規表現で取り出す
+        ## 属性値は HTML エスケープされているため、JSON としてパースする前にアンエスケープする
+        props: str | None
+        match = _EMBEDDED_DATA_PROPS_PATTERN.search(response.content)
+        if match is not None:
+            props = html.unescape(match.group(1).decode('utf-8'))
+
+        # 視聴ページのマークアップが変わって正規表現にマッチしなかった場合は、HTML 全体をパースして取り出す
+        ## lxml の HTML パーサーでパースし、XPath で data-props 属性の値だけを取り出す (属性値のアンエスケープは lxml が行うため、html.unescape() は不要)
+        ## デコード済みの response.text ではなく bytes を渡し、UTF-8 としてのデコードも lxml 側に任せる
+        else:
+            props = None
+            watch_page_html = ET.HTML(response.content, parser=_WATCH_PAGE_HTML_PARSER)
+            if watch_page_html is not None:
+                embedded_data_props: list[str] = _EMBEDDED_DATA_PROPS_XPATH(watch_page_html)  # type: ignore
+                if embedded_data_props:
+                    props = embedded_data_props[0]
+        assert isinstance(props, str)
+        embedded_data = orjson.loads(props)
+        assert isinstance(embedded_data, dict)
+        assert 'program' in embedded_data
+        assert 'site' in embedded_data
+        assert 'relive' in embedded_data['site']
+
+        # 視聴ページに ETag / Last-Modified ヘッダーが付いていれば、次回の条件付きリクエスト用に embedded-data と一緒に保持する
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if etag is not None or last_modified is not None:
+            self._watch_page_cache = (watch_page_url, etag, last_modified, embedded_data)
+        else:
+            self._watch_page_cache = None
+
+        return embedded_data
+
+
     async def fetchNDGRViewURI(self, webSocketUrl: str) -> str:
         """
         ニコニコ生放送の視聴ページから取得した webSocketUrl に接続し、NDGR View API の URI を取得する
@@ -784,17 +1250,26 @@ class NDGRClient:
         async with websockets.connect(webSocketUrl, user_agent_header=self.HTTP_HEADERS['user-agent']) as websocket:
 
             # 接続が確立したら、視聴開始リクエストを送る
-            await websocket.send(json.dumps({
+            ## orjson.dumps() は bytes を返すため、バイナリフレームではなくテキストフレームとして送るよう str にデコードする
+            await websocket.send(orjson.dumps({
                 'type': 'startWatching',
                 'data': {
                     'reconnect': False,
                 },
-            }))
+            }).decode('utf-8'))
 
             # メッセージを受信し、NDGR View API の URI を取得する
             while True:
                 message = await websocket.recv()
-                data = json.loads(message)
+
+                # 必要なのは messageServer メッセージだけなので、それ以外のメッセージ (seat, statistics, ping など) は JSON としてパースせずに読み飛ばす
+                ## "messageServer" という文字列を含まないメッセージが messageServer メッセージであることはあり得ない
+                if isinstance(message, bytes):
+                    if b'"messageServer"' not in message:
+                        continue
+                elif '"messageServer"' not in message:
+                    continue
+                data = orjson.loads(message)
 
                 # NDGR View API の URI を伝えるメッセージ
                 if data['type'] == 'messageServer':
@@ -818,19 +1293,20 @@ class NDGRClient:
                     return view_uri
 
 
-    async def fetchChunkedEntries(self, view_api_uri: str, at: str | None) -> AsyncGenerator[chat.ChunkedEntry, None]:
+    async def fetchChunkedEntries(self, view_api_uri: str, at: int | str | None) -> AsyncGenerator[chat.ChunkedEntry, None]:
         """
         NDGR View API から ChunkedEntry を受信する
 
         Args:
             view_api_uri (str): NDGR View API の URI
-            at (str | None): NDGR View API へのアクセス時に ?at= に指定するタイムスタンプ
+            at (int | str | None): NDGR View API へのアクセス時に ?at= に指定する UNIX タイムスタンプ (初回アクセス時は 'now')
 
         Yields:
             chunked_entry (chat.ChunkedEntry): NDGR View API から受信した ChunkedEntry
         """
 
-        url = f'{view_api_uri}?at={at}' if at else view_api_uri
+        ## ChunkedEntry.ReadyForNext.at の整数値は、事前に str に変換せずそのまま f-string でフォーマットする
+        url = f'{view_api_uri}?at={at}' if at is not None and at != '' else view_api_uri
         async for chunked_entry in self.fetchProtobufStream(url, chat.ChunkedEntry):
             yield chunked_entry
 
@@ -847,34 +1323,26 @@ class NDGRClient:
             NDGRComment: 変換された NDGRComment
         """
 
-        async for chunked_message in self.fetchProtobufStream(segment_uri, chat.ChunkedMessage):
-            # meta または message が存在しない場合は空の ChunkedMessage なので無視する
-            if not chunked_message.HasField('meta') or not chunked_message.HasField('message'):
-                continue
-            # NicoLiveMessage の中に chat or overflowed_chat がない場合は運営コメントや市場などコメント以外のメッセージなので無視する
-            # 通常のコメントであればどちらかは必ず存在するはず
-            if not chunked_message.message.HasField('chat') and not chunked_message.message.HasField('overflowed_chat'):
-                continue
-            # Chat の中に Modifier がない場合 (存在するのか？) はコメントの位置や色などの情報が取れないのでとりあえず無視する
-            if chunked_message.message.HasField('chat'):
-                message_chat = chunked_message.message.chat
-            else:
-                message_chat = chunked_message.message.overflowed_chat
-            if not message_chat.HasField('modifier'):
+        ## 受信した ChunkedMessage はその場で NDGRComment に変換して破棄するため、インスタンスを使い回させている
+        async for chunked_message in self.fetchProtobufStream(segment_uri, chat.ChunkedMessage, reuse_instance=True):
+            # NDGRComment に変換できない ChunkedMessage は無視する
+            if not self.__isConvertibleToNDGRComment(chunked_message):
                 continue
             yield self.convertToNDGRComment(chunked_message)
 
 
     ProtobufType = TypeVar('ProtobufType', chat.ChunkedEntry, chat.ChunkedMessage, chat.PackedSegment)
-    async def fetchProtobufStream(self, uri: str, protobuf_class: Type[ProtobufType]) -> AsyncGenerator[ProtobufType, None]:
+    async def fetchProtobufStream(self, uri: str, protobuf_class: Type[ProtobufType], reuse_instance: bool = False) -> AsyncGenerator[ProtobufType, None]:
         """
         Protobuf ストリームを読み込み、読み取った Protobuf チャンクをジェネレータで返す
         Protobuf ストリームを最後まで読み切ったら None を返す
-        エラー発生時は 5 回までリトライしてから例外を送出する
+        エラー発生時は待機時間を倍々に伸ばしながら PROTOBUF_STREAM_MAX_RETRIES 回までリトライしてから例外を送出する
 
         Args:
             uri (str): 読み込む Protobuf ストリームの URI
             protobuf_class (Type[ProtobufType]): 読み込む Protobuf の型
+            reuse_instance (bool, default=False): 返す Protobuf のインスタンスをチャンクごとに作り直さず使い回すかどうか
+                (有効にすると次のチャンクを読み取った時点で前に返したインスタンスの内容が上書きされるため、受け取った側で参照を保持しない場合のみ指定する)
 
         Yields:
             ProtobufType: Protobuf チャンク (protobuf_class で指定した型)
@@ -885,16 +1353,18 @@ class NDGRClient:
             api_name = 'NDGR View API'
         elif '/segment/' in uri:
             api_name = 'NDGR Segment API'
-        self.print(f'[{datetime.now().strftime("%Y/%m/%d %H:%M:%S.%f")}] Fetching {api_name} ...', verbose_log=True)
-        self.print(uri, verbose_log=True)
-        self.print(Rule(characters='-', style=Style(color='#E33157')), verbose_log=True)
+        if self.verbose is True:
+            self.print(f'[{datetime.now().strftime("%Y/%m/%d %H:%M:%S.%f")}] Fetching {api_name} ...', verbose_log=True)
+            self.print(uri, verbose_log=True)
+            self.print(_SECTION_RULE, verbose_log=True)
 
-        max_retries = 5  # 5回までリトライ
-        retry_delay = 3  # 3秒待ってリトライ
+        max_retries = self.PROTOBUF_STREAM_MAX_RETRIES
 
         for attempt in range(max_retries):
             try:
                 protobuf_reader = ProtobufStreamReader()
+                ## ParseFromString() は内部で既存の内容をクリアしてからパースするため、使い回す場合も前のチャンクの内容は残らない
+                reused_protobuf = protobuf_class() if reuse_instance is True else None
 
                 # Protobuf ストリームを受信
                 # read タイムアウトのみ 40 秒、それ以外は 15 秒に設定
@@ -914,22 +1384,27 @@ class NDGRClient:
                             message = protobuf_reader.unshiftChunk()
                             if message is None:
                                 break
-                            protobuf = protobuf_class()
+                            protobuf = reused_protobuf if reused_protobuf is not None else protobuf_class()
                             protobuf.ParseFromString(message)
 
                             # ジェネレータとして読み取った Protobuf を返す
                             yield protobuf
 
                 # Protobuf ストリームを最後まで読み切ったら、ループを抜ける
-                self.print(f'[{datetime.now().strftime("%Y/%m/%d %H:%M:%S.%f")}] Fetched {api_name}.', verbose_log=True)
-                self.print(uri, verbose_log=True)
-                self.print(Rule(characters='-', style=Style(color='#E33157')), verbose_log=True)
+                if self.verbose is True:
+                    self.print(f'[{datetime.now().strftime("%Y/%m/%d %H:%M:%S.%f")}] Fetched {api_name}.', verbose_log=True)
+                    self.print(uri, verbose_log=True)
+                    self.print(_SECTION_RULE, verbose_log=True)
                 break
 
             # HTTP 接続エラー発生時、しばらく待ってからリトライを試みる
+            ## 一時的なネットワークの瞬断ならすぐに復帰できるよう最初は短く待ち、失敗が続くほど待機時間を倍々に伸ばす
+            ## 複数のストリームが同時に失敗した際に一斉にリトライしないよう、待機時間に揺らぎを持たせる
             except (httpx.HTTPError, httpx.StreamError):
                 if attempt < max_retries - 1:
-                    self.print(f'Error fetching {api_name}. Retrying in {retry_delay} seconds...')
+                    retry_delay = min(self.PROTOBUF_STREAM_MIN_RETRY_DELAY * (2 ** attempt), self.PROTOBUF_STREAM_MAX_RETRY_DELAY)
+                    retry_delay *= random.uniform(1.0, 1.0 + self.PROTOBUF_STREAM_RETRY_JITTER)
+                    self.print(f'Error fetching {api_name}. Retrying in {retry_delay:.2f} seconds...')
                     self.print(traceback.format_exc())
                     await asyncio.sleep(retry_delay)
 
@@ -937,10 +1412,29 @@ class NDGRClient:
                 else:
                     self.print(f'Error fetching {api_name}. Max retries reached.')
                     self.print(traceback.format_exc())
-                    self.print(Rule(characters='-', style=Style(color='#E33157')))
+                    self.print(_SECTION_RULE)
                     raise
 
 
+    def __printProgramInfo(self, nicolive_program_info: NicoLiveProgramInfo) -> None:
+        """
+        ニコニコ生放送番組のタイトルと放送期間を動作ログに出力する
+
+        Args:
+            nicolive_program_info (NicoLiveProgramInfo): ニコニコ生放送の番組情報
+        """
+
+        # コンソールにもファイルにも出力しない場合は、日時の変換やフォーマット自体を省略する
+        if self.show_log is False and self.log_path is None:
+            return
+
+        # 公開時刻と終了時刻はそれぞれ 1 回だけ datetime に変換する
+        open_time = datetime.fromtimestamp(nicolive_program_info.openTime)
+        end_time = datetime.fromtimestamp(nicolive_program_info.endTime)
+        self.print(f'Title:  {nicolive_program_info.title} [{nicolive_program_info.status}] ({nicolive_program_info.nicoliveProgramId})')
+        self.print(f'Period: {open_time.strftime("%Y-%m-%d %H:%M:%S")} ~ {end_time.strftime("%Y-%m-%d %H:%M:%S")} ({end_time - open_time}h)')
+
+
     def print(self, *args: Any, verbose_log: bool = False, **kwargs: Any) -> None:
         """
         NDGRClient の動作ログをコンソールやファイルに出力する
@@ -953,14 +1447,120 @@ class NDGRClient:
         if verbose_log is True and self.verbose is False:
             return
 
+        # コンソールにもファイルにも出力しない場合は、rich でのレンダリングを行う前に何もせず戻る
+        if self.show_log is False and self.log_path is None:
+            return
+
         # 有効ならログをコンソールに出力する
         if self.show_log is True:
             print(*args, **kwargs)
 
         # ログファイルのパスが指定されている場合は、ログをファイルにも出力
+        ## 毎回ファイルを開閉するとログ 1 行ごとに open() / close() が走るため、初回に開いたファイルを aclose() するまで使い回す
         if self.log_path is not None:
-            with self.log_path.open('a') as f:
-                print(*args, **kwargs, file=f)
+            if self._log_file is None:
+                self.__openLogFile(self.log_path)
+                assert self._log_file is not None and self._log_file_writer is not None
+            print(*args, **kwargs, file=self._log_file_writer)
+            # エラーを含む通常の動作ログは、プロセスの実行中でも確実にファイルに残るよう即座にフラッシュする
+            ## 大量に出力される詳細な動作ログのみバッファに溜め、LOG_FILE_FLUSH_INTERVAL 行ごとにまとめてファイルへ書き出す
+            if verbose_log is False:
+                self._log_file.flush()
+                self._log_file_unflushed_lines = 0
+            else:
+                self._log_file_unflushed_lines += 1
+                if self._log_file_unflushed_lines >= self.LOG_FILE_FLUSH_INTERVAL:
+                    self._log_file.flush()
+                    self._log_file_unflushed_lines = 0
+
+
+    def __openLogFile(self, log_path: Path) -> None:
+        """
+        動作ログの出力先のログファイルを開く
+        他の NDGRClient インスタンスが同じパスのログファイルを開いている場合は、そのファイルオブジェクトを共有する
+
+        Args:
+            log_path (Path): ログファイルのパス
+        """
+
+        log_file_key = log_path.resolve()
+        if log_file_key in _SHARED_LOG_FILES:
+            log_file, ref_count = _SHARED_LOG_FILES[log_file_key]
+        else:
+            log_file, ref_count = log_path.open('a', buffering=self.LOG_FILE_BUFFER_SIZE), 0
+            # aclose() が呼ばれなかった場合でも、インタプリタ終了時にはバッファに残ったログを書き出してから閉じる
+            atexit.register(log_file.close)
+        _SHARED_LOG_FILES[log_file_key] = (log_file, ref_count + 1)
+        self._log_file = log_file
+        self._log_file_key = log_file_key
+        self._log_file_writer = _LogFileWriter(log_file)  # type: ignore
+
+
+    async def aclose(self) -> None:
+        """
+        HTTP クライアントと、動作ログの出力先として開いたログファイルを閉じる
+        同じパスのログファイルを他の NDGRClient インスタンスが使っている場合は、最後のインスタンスが閉じた時点でファイルが閉じられる
+        aclose() した後の NDGRClient インスタンスは再利用できない
+        """
+
+        self.__closeLogFile()
+        await self.httpx_client.aclose()
+
+
+    def __closeLogFile(self) -> None:
+        """
+        動作ログの出力先として開いたログファイルをフラッシュし、他に使っているインスタンスがなければ閉じる
+        """
+
+        if self._log_file is None or self._log_file_key is None:
+            return
+
+        log_file, ref_count = _SHARED_LOG_FILES[self._log_file_key]
+        log_file.flush()
+        if ref_count > 1:
+            _SHARED_LOG_FILES[self._log_file_key] = (log_file, ref_count - 1)
+        else:
+            # atexit が保持しているファイルオブジェクトへの参照も解放する
+            del _SHARED_LOG_FILES[self._log_file_key]
+            atexit.unregister(log_file.close)
+            log_file.close()
+
+        self._log_file = None
+        self._log_file_key = None
+        self._log_file_writer = None
+        self._log_file_unflushed_lines = 0
+
+
+    @staticmethod
+    def __isConvertibleToNDGRComment(chunked_message: chat.ChunkedMessage) -> bool:
+        """
+        ChunkedMessage が NDGRComment に変換可能な (コメントを表す) メッセージかどうかを判定する
+        fetchChunkedMessages() と downloadBackwardComments() で共通の判定処理
+
+        Args:
+            chunked_message (chat.ChunkedMessage): ChunkedMessage
+
+        Returns:
+            bool: NDGRComment に変換可能であれば True
+        """
+
+        # meta が存在しない場合は空の ChunkedMessage なので無視する
+        if not chunked_message.HasField('meta'):
+            return False
+        # NicoLiveMessage の中に chat or overflowed_chat がない場合は運営コメントや市場などコメント以外のメッセージなので無視する
+        # 通常のコメントであればどちらかは必ず存在するはず
+        ## HasField() を何度も呼ぶ代わりに、oneof data のうち設定されているフィールド名を WhichOneof() で一度だけ取得して判定する
+        ## message が存在しない場合も WhichOneof() は None を返すため、ここで一緒に除外される
+        message = chunked_message.message
+        message_data_type = message.WhichOneof('data')
+        if message_data_type == 'chat':
+            message_chat = message.chat
+        elif message_data_type == 'overflowed_chat':
+            message_chat = message.overflowed_chat
+        else:
+            return False
+        # Chat の中に Modifier がない場合 (存在するのか？) はコメントの位置や色などの情報が取れないのでとりあえず無視する
+        return message_chat.HasField('modifier')
 
 
     @staticmethod
@@ -976,42 +1576,46 @@ class NDGRClient:
         """
 
         assert chunked_message.HasField('message')
-        assert chunked_message.message.HasField('chat') or chunked_message.message.HasField('overflowed_chat')
+        message = chunked_message.message
+        message_data_type = message.WhichOneof('data')
+        assert message_data_type == 'chat' or message_data_type == 'overflowed_chat'
 
         # chat または overflowed_chat のどちらかを取得
         ## overflowed_chat は「メインとなるコメント空間（アリーナ）からあふれたユーザーコメント」を表す (通常は表示されない)
-        if chunked_message.message.HasField('chat'):
-            message_chat = chunked_message.message.chat
+        if message_data_type == 'chat':
+            message_chat = message.chat
         else:
-            message_chat = chunked_message.message.overflowed_chat
+            message_chat = message.overflowed_chat
         assert message_chat.HasField('modifier')
+        modifier = message_chat.modifier
+        meta = chunked_message.meta
+        meta_at = meta.at
 
         # 色は named_color または full_color のどちらかで指定されている
         # 万が一どちらも指定されている場合は、full_color を優先する
-        color = 'white'
-        if message_chat.modifier.HasField('full_color'):
-            color = NDGRCommentFullColor(
-                r = message_chat.modifier.full_color.r,
-                g = message_chat.modifier.full_color.g,
-                b = message_chat.modifier.full_color.b,
-            )
-        elif message_chat.modifier.HasField('named_color'):
-            color = cast(Any, atoms.Chat.Modifier.ColorName.Name(message_chat.modifier.named_color).lower())
-
-        comment = NDGRComment(
-            id = chunked_message.meta.id,
-            at = datetime.fromtimestamp(chunked_message.meta.at.seconds + (chunked_message.meta.at.nanos / 1e9)),
-            live_id = chunked_message.meta.origin.chat.live_id,
+        color: Any = 'white'
+        if modifier.HasField('full_color'):
+            full_color = modifier.full_color
+            color = NDGRCommentFullColor.model_construct(r=full_color.r, g=full_color.g, b=full_color.b)
+        elif modifier.HasField('named_color'):
+            color = _COLOR_NAMES[modifier.named_color]
+
+        # 各値は Protobuf のスキーマにより型が保証されているため、model_construct() でバリデーションを省略している
+        comment = NDGRComment.model_construct(
+            id = meta.id,
+            ## timedelta を加算すると fold が 0 に戻り、夏時間終了時の 2 回目の時刻が 1 回目の時刻として扱われてしまうため、replace() で置き換える
+            at = _datetime_from_seconds(meta_at.seconds).replace(microsecond=meta_at.nanos // 1000),
+            live_id = meta.origin.chat.live_id,
             raw_user_id = message_chat.raw_user_id,
             hashed_user_id = message_chat.hashed_user_id,
-            account_status = cast(Any, atoms.Chat.AccountStatus.Name(message_chat.account_status)),
+            account_status = _ACCOUNT_STATUS_NAMES[message_chat.account_status],
             no = message_chat.no,
             vpos = message_chat.vpos,
-            position = cast(Any, atoms.Chat.Modifier.Pos.Name(message_chat.modifier.position).lower()),
-            size = cast(Any, atoms.Chat.Modifier.Size.Name(message_chat.modifier.size).lower()),
+            position = _POSITION_NAMES[modifier.position],
+            size = _SIZE_NAMES[modifier.size],
             color = color,
-            font = cast(Any, atoms.Chat.Modifier.Font.Name(message_chat.modifier.font).lower()),
-            opacity = cast(Any, atoms.Chat.Modifier.Opacity.Name(message_chat.modifier.opacity)),
+            font = _FONT_NAMES[modifier.font],
+            opacity = _OPACITY_NAMES[modifier.opacity],
             content = message_chat.content,
         )
 
@@ -1031,45 +1635,40 @@ class NDGRClient:
         """
 
         # "mail" フィールドに入るコメントコマンドを生成
-        command = []
-        # raw_user_id が 0 の場合はユーザー ID が匿名化されているため、"184" コマンドを付与する
-        if comment.raw_user_id == 0:
-            command.append('184')
-        if comment.position != 'naka':
-            command.append(comment.position)
-        if comment.size != 'medium':
-            command.append(comment.size)
-        if isinstance(comment.color, str) and comment.color != 'white':
-            command.append(comment.color)
-        elif isinstance(comment.color, NDGRCommentFullColor):
-            command.append(f'#{comment.color.r:02x}{comment.color.g:02x}{comment.color.b:02x}')
-        if comment.font != 'defont':
-            command.append(comment.font)
-        # コメントの不透明度を表すコメントコマンドは従来存在しないが、
-        ## コメントの装飾情報は原則保存しておきたいので、特別に opacity が "Translucent" の場合のみ "translucent" コマンドを付与する
-        if comment.opacity == 'Translucent':
-            command.append('translucent')
+        ## 同じ装飾情報の組み合わせのコメントコマンドは一度生成したらキャッシュから取得する
+        raw_user_id = comment.raw_user_id
+        color = comment.color
+        is_anonymous = raw_user_id == 0
+        color_key = color if isinstance(color, str) else (color.r, color.g, color.b)
+        mail = _build_mail_command(is_anonymous, comment.position, comment.size, color_key, comment.font, comment.opacity)
 
         # raw_user_id が 0 より上だったら生のユーザー ID を採用し、なければ hashed_user_id (匿名化されたユーザー ID) を採用
-        if comment.raw_user_id > 0:
-            user_id = str(comment.raw_user_id)
+        if raw_user_id > 0:
+            user_id = str(raw_user_id)
         else:
             user_id = str(comment.hashed_user_id)
 
+        # コメント投稿時刻の UNIX タイムスタンプを秒単位の整数とマイクロ秒単位の整数に分けて取得
+        ## comment.at はマイクロ秒単位の整数から生成されているため、秒未満の値は浮動小数点演算を介さず microsecond から直接取得できる
+        at = comment.at
+        date_usec = at.microsecond
+        date = int(_timestamp_from_datetime(at.replace(microsecond=0), at.fold))
+
         # XMLCompatibleComment オブジェクトを生成
-        xml_compatible_comment = XMLCompatibleComment(
+        ## 各値は型が確定済みの NDGRComment から生成しているため、model_construct() でバリデーションを省略している
+        xml_compatible_comment = XMLCompatibleComment.model_construct(
             # lv 付きの生放送番組 ID をスレッド ID として設定
             ## NDGR メッセージサーバーには「スレッド」と一対一で対応する概念は存在しない
             thread = f'lv{comment.live_id}',
             no = comment.no,
             vpos = comment.vpos,
-            date = int(comment.at.timestamp()),
-            date_usec = int((comment.at.timestamp() % 1) * 1000000),
+            date = date,
+            date_usec = date_usec,
             user_id = user_id,
-            mail = ' '.join(command),
+            mail = mail,
             premium = 1 if comment.account_status == 'Premium' else None,
             # raw_user_id が 0 の場合は anonymity フィールドに 1 を設定している
-            anonymity = 1 if comment.raw_user_id == 0 else None,
+            anonymity = 1 if is_anonymous else None,
             content = comment.content,
         )
 
@@ -1088,50 +1687,65 @@ class NDGRClient:
             str: XML 文字列
         """
 
-        def sanitize_for_xml(text: str) -> str:
-            # XML と互換性のない制御文字を除去
-            # 有効な XML 制御文字 (タブ、改行、復帰) は保持
-            return re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+        string_io = io.StringIO()
+        NDGRClient.writeXML(comments, string_io)
+        return string_io.getvalue()
+
 
-        # XML のエレメントツリー
-        elem_tree = ET.Element('packet')
+    @staticmethod
+    def writeXML(comments: Sequence[NDGRComment | XMLCompatibleComment], file: TextIO) -> None:
+        """
+        コメントリストをコメント投稿時刻順にソートしたヘッダーなし XML (.nicojk 形式) に変換し、ファイルオブジェクトに書き込む
+        <chat> エレメントを 1 つずつシリアライズして書き込むため、XML 全体をメモリ上に保持せずに済む
+
+        Args:
+            comments (Sequence[NDGRComment | XMLCompatibleComment]): NDGRComment または XMLCompatibleComment のリスト
+            file (TextIO): 書き込み先のテキストファイルオブジェクト
+        """
 
         # コメントを XMLCompatibleComment に変換し、コメント投稿時刻昇順でソート
         xml_compatible_comments = [
             NDGRClient.convertToXMLCompatibleComment(comment) if isinstance(comment, NDGRComment) else comment
             for comment in comments
         ]
-        xml_compatible_comments.sort(key=lambda x: x.date_with_usec)
+        ## date_with_usec プロパティ (date + date_usec / 1000000) の代わりに (date, date_usec) のタプルをキーにすると、
+        ## 並び順は変わらないまま、キーの取得を Python の関数呼び出しを介さず operator.attrgetter() で C 実装のまま行える
+        ## 取得時点で投稿時刻順に並んでいるコメントリストの場合、Timsort は 1 回の走査でソート済みと判定して終わる
+        xml_compatible_comments.sort(key=operator.attrgetter('date', 'date_usec'))
 
         # コメントごとに
-        for xml_compatible_comment in xml_compatible_comments:
-
-            # コメントをさらに辞書に変換
-            comment_dict = xml_compatible_comment.model_dump()
-
-            # コメント本文を取得して消す（ XML ではタグ内の値として入るため）
-            chat_content = comment_dict['content']
-            del comment_dict['content']
+        ## <chat> エレメントの属性は XMLCompatibleComment のフィールドで固定されているため、model_dump() で辞書に変換して
+        ## lxml のエレメントを組み立てるのではなく、各フィールドから直接 <chat> エレメントの文字列をフォーマットする
+        ## 属性の順序や文字のエスケープ方法は、従来の lxml.etree でのシリアライズ結果と同一になるようにしている
+        ## <packet> タグで囲まずインデントもしない .nicojk 形式にするため、<chat> エレメントを 1 つずつ改行で区切って書き込む
+        file_write = file.write
+        for index, xml_compatible_comment in enumerate(xml_compatible_comments):
+            user_id = xml_compatible_comment.user_id
+            chat_elem = (
+                f'<chat thread="{xml_compatible_comment.thread.translate(_XML_ATTRIBUTE_ESCAPE_TABLE)}" '
+                f'no="{xml_compatible_comment.no}" '
+                f'vpos="{xml_compatible_comment.vpos}" '
+                f'date="{xml_compatible_comment.date}" '
+                f'date_usec="{xml_compatible_comment.date_usec}" '
+                f'user_id="{user_id.translate(_XML_ATTRIBUTE_ESCAPE_TABLE)}" '
+                f'mail="{xml_compatible_comment.mail.translate(_XML_ATTRIBUTE_ESCAPE_TABLE)}"'
+            )
+            if xml_compatible_comment.premium is not None:
+                chat_elem += f' premium="{xml_compatible_comment.premium}"'
+            if xml_compatible_comment.anonymity is not None:
+                chat_elem += f' anonymity="{xml_compatible_comment.anonymity}"'
 
             # ユーザー ID が 35 文字以上のコメントを NX-Jikkyo に投稿されたコメントと判定し、識別用に nx_jikkyo="1" を追加する
             ## NX-Jikkyo で生成されるユーザー ID は SHA-1: 40 文字 (初期に投稿されたコメントのみ UUID v4: 36 文字) のため、
             ## 35 文字以上であれば確実に NX-Jikkyo に投稿されたコメントだと判定できる
             ## NDGRClient ライブラリの責務的には本来ここに書くべき処理ではないが、とはいえこの関数を独自実装するとコードが重複するためやむを得ず…
-            if len(comment_dict['user_id']) >= 35:
-                comment_dict['nx_jikkyo'] = '1'
-
-            # 属性を XML エレメントに追加
-            sanitized_attrs = {key: sanitize_for_xml(str(value)) for key, value in comment_dict.items() if value is not None}
-            chat_elem_tree = ET.SubElement(elem_tree, 'chat', sanitized_attrs)
-
-            # XML エレメント内の値に以前取得した本文を指定
-            ## 制御文字が入ってると ValueError: All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters と
-            ## lxml からエラーを吐かれるので sanitize してから設定している
-            chat_elem_tree.text = sanitize_for_xml(chat_content)
-
-        # 素の XML を .nicojk 形式向けにフォーマットする
-        # lxml.etree を使うことで属性の順序を保持できる
-        # ref: https://banatech.net/blog/view/19
-        xml_string = ET.tostring(elem_tree, encoding='utf-8', pretty_print=True).decode('utf-8').replace('>\n  ', '>\n')  # インデントを除去
-        xml_string = xml_string.replace('<packet>\n', '').replace('</packet>', '').replace('<packet/>', '')  # <packet> タグを除去
-        return xml_string.rstrip()
+            if len(user_id) >= 35:
+                chat_elem += ' nx_jikkyo="1"'
+
+            # XML エレメント内の値にコメント本文を指定
+            ## 制御文字は XML と互換性がないため、エスケープと同時に除去している
+            chat_elem += f'>{xml_compatible_comment.content.translate(_XML_TEXT_ESCAPE_TABLE)}</chat>'
+
+            if index > 0:
+                file_write('\n')
+            file_write(chat_elem)
@@ -2,6 +2,26 @@
 from rich import print
 
 
+# varint の最大バイト数
+_VARINT_MAX_BYTES = 10
+
+# 先頭 n バイトの各 MSB (継続ビット) を立てたマスク
+_MSB_MASKS = tuple(int.from_bytes(b'\x80' * n, 'little') for n in range(_VARINT_MAX_BYTES + 1))
+
+# 7 ビットずつのグループを連結する際に使うマスク (128 ビット幅)
+## 各段階で (下位側のグループを残すマスク, 上位側のグループをシフト後に残すマスク) の順に並んでいる
+_COMPACT_MASKS = (
+    int.from_bytes(b'\x7f\x00' * 8, 'little'),
+    int.from_bytes(b'\x80\x3f' * 8, 'little'),
+    int.from_bytes(b'\xff\x3f\x00\x00' * 4, 'little'),
+    int.from_bytes(b'\x00\xc0\xff\x0f' * 4, 'little'),
+    int.from_bytes(b'\xff\xff\xff\x0f\x00\x00\x00\x00' * 2, 'little'),
+    int.from_bytes(b'\x00\x00\x00\xf0\xff\xff\xff\x00' * 2, 'little'),
+    int.from_bytes(b'\xff\xff\xff\xff\xff\xff\xff\x00' + b'\x00' * 8, 'little'),
+    int.from_bytes(b'\x00' * 7 + b'\xff' * 7 + b'\x00\x00', 'little'),
+)
+
+
 class ProtobufStreamReader:
     """
     NDGR メッセージサーバーの Length-Delimited Protobuf Streams を読み取るためのクラス
@@ -32,26 +52,45 @@ class ProtobufStreamReader:
     def __readVarInt(self) -> tuple[int, int] | None:
         """
         バッファから可変長整数 (varint) を読み取る
+        1 バイトずつループで読み取る代わりに、先頭最大 10 バイトを 1 つの整数として読み込み、
+        ビット演算で終端バイトの位置の特定と 7 ビットずつのグループの連結をまとめて行う (SWAR)
 
         Returns:
             tuple[int, int] | None: (オフセット, 結果の整数値) のタプル (データが不足している場合は None を返す)
+
+        Raises:
+            ValueError: 10 バイト読んでも varint が終端しない (不正なデータ) 場合
         """
 
-        offset = 0
-        result = 0
-        i = 0
-        while True:
-            if offset >= len(self.buffer):
-                return None  # データが不足している場合
-
-            current = self.buffer[offset]
-            result |= (current & 0x7F) << i
-            offset += 1
-            i += 7
-            if not (current & 0x80):
-                break
-
-        return offset, result
+        buffer = self.buffer
+        if not buffer:
+            return None  # データが不足している場合
+
+        # 1 バイトで収まる varint (127 以下) はそのまま返す
+        first = buffer[0]
+        if first < 0x80:
+            return 1, first
+
+        # 先頭最大 10 バイトをリトルエンディアンの整数として読み込み、MSB が 0 の (= varint の終端となる) バイトを探す
+        available = min(len(buffer), _VARINT_MAX_BYTES)
+        word = int.from_bytes(buffer[:available], 'little')
+        terminators = ~word & _MSB_MASKS[available]
+        if terminators == 0:
+            if available == _VARINT_MAX_BYTES:
+                raise ValueError('Malformed varint: exceeds 10 bytes.')
+            return None  # データが不足している場合
+
+        # 最下位の終端バイトの位置からオフセット (varint のバイト数) を求め、varint 以外のバイトを落とす
+        offset = (terminators & -terminators).bit_length() >> 3
+        word &= (1 << (offset << 3)) - 1
+
+        # 8 ビット間隔で並んでいる 7 ビットずつのグループを、隣り合うグループ同士で段階的に詰めて連結する
+        word = (word & _COMPACT_MASKS[0]) | ((word >> 1) & _COMPACT_MASKS[1])
+        word = (word & _COMPACT_MASKS[2]) | ((word >> 2) & _COMPACT_MASKS[3])
+        word = (word & _COMPACT_MASKS[4]) | ((word >> 4) & _COMPACT_MASKS[5])
+        word = (word & _COMPACT_MASKS[6]) | ((word >> 8) & _COMPACT_MASKS[7])
+
+        return offset, word
 
 
     def unshiftChunk(self) -> bytes | None:
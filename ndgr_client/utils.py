@@ -25,6 +25,12 @@ from functools import partial, wraps
 from typer import Typer
 from typing import Any, Callable, TypeVar
 
+# uvloop がインストールされている環境 (Windows 以外) では、高速な uvloop のイベントループで実行する
+try:
+    import uvloop  # type: ignore
+except ImportError:
+    uvloop = None
+
 F = TypeVar('F', bound=Callable[..., Any])
 
 
@@ -35,6 +41,9 @@ class AsyncTyper(Typer):
 
             @wraps(f)
             def runner(*args, **kwargs):  # type: ignore
+                if uvloop is not None:
+                    with asyncio.Runner(loop_factory=uvloop.new_event_loop) as asyncio_runner:
+                        return asyncio_runner.run(f(*args, **kwargs))
                 return asyncio.run(f(*args, **kwargs))
 
             decorator(runner)